@@ -21,8 +21,19 @@ Features:
     - Built-in caching for performance
 """
 
-from .market import Nepse, AsyncNepse
 from .version import __version__
 
 __author__ = "NEPSE Core Contributors"
 __all__ = ["Nepse", "AsyncNepse"]
+
+
+def __getattr__(name):
+    # Lazy exports (PEP 562): importing the package doesn't load the HTTP/WASM stack
+    if name in __all__:
+        from . import market
+        return getattr(market, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def __dir__():
+    return sorted(list(globals()) + __all__)
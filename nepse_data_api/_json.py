@@ -0,0 +1,92 @@
+"""
+JSON helpers - use orjson/simdjson when installed, fall back to the stdlib.
+"""
+
+import dataclasses
+import json
+import threading
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import simdjson
+except ImportError:
+    simdjson = None
+
+# simdjson parsers are not thread-safe, keep one per thread
+_local = threading.local()
+
+
+if orjson is not None:
+    # numpy arrays/scalars, datetimes and dataclasses are serialized natively by orjson
+    _ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+
+
+def _default(obj):
+    """stdlib fallback for the types orjson handles natively"""
+    if dataclasses.is_dataclass(obj) and not isinstance(obj, type):
+        return dataclasses.asdict(obj)
+    if hasattr(obj, "isoformat"):
+        return obj.isoformat()
+    if hasattr(obj, "tolist"):
+        return obj.tolist()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def dumps(obj, pretty: bool = False) -> str:
+    """Serialize obj to a JSON string (UTF-8, non-ASCII kept as-is)"""
+    if orjson is not None:
+        return dumpb(obj, pretty=pretty).decode()
+    return json.dumps(obj, indent=2 if pretty else None, ensure_ascii=False, default=_default)
+
+
+def dumpb(obj, pretty: bool = False) -> bytes:
+    """Serialize obj to UTF-8 encoded JSON bytes"""
+    if orjson is not None:
+        option = _ORJSON_OPTIONS
+        if pretty:
+            option |= orjson.OPT_INDENT_2
+        return orjson.dumps(obj, option=option)
+    return dumps(obj, pretty=pretty).encode("utf-8")
+
+
+def _parser():
+    parser = getattr(_local, "parser", None)
+    if parser is None:
+        parser = _local.parser = simdjson.Parser()
+    return parser
+
+
+def _materialize(node):
+    if isinstance(node, simdjson.Object):
+        return node.as_dict()
+    if isinstance(node, simdjson.Array):
+        return node.as_list()
+    return node
+
+
+def loads(data):
+    """Parse a JSON document (bytes or str) into Python objects"""
+    if orjson is not None:
+        return orjson.loads(data)
+    if simdjson is not None:
+        return _materialize(_parser().parse(data))
+    return json.loads(data)
+
+
+def loads_head(data, limit: int):
+    """
+    Parse a JSON array, materializing only its first `limit` elements.
+    With simdjson the remaining rows are never converted to Python objects.
+    Non-array documents are returned whole.
+    """
+    if simdjson is not None:
+        doc = _parser().parse(data)
+        if isinstance(doc, simdjson.Array):
+            return [_materialize(doc[i]) for i in range(min(limit, len(doc)))]
+        return _materialize(doc)
+    doc = json.loads(data)
+    return doc[:limit] if isinstance(doc, list) else doc
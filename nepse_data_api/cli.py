@@ -4,54 +4,135 @@ NEPSE CLI Tool - Command-line interface for NEPSE data
 """
 
 import argparse
-import json
 import sys
-from nepse_data_api.market import Nepse
-from datetime import datetime
+import time
+from operator import itemgetter
+from nepse_data_api import _json
+
+_GREEN = '\033[92m'
+_RED = '\033[91m'
+_BOLD = '\033[1m'
+_RESET = '\033[0m'
+_COLORS = (_RED, _GREEN)  # indexed by a bool: False -> red, True -> green
+
+_ROW_FIELDS = itemgetter('symbol', 'ltp', 'percentageChange')
+_ROW_FMT = "{:<12} {:<10} {}{}%".format
+_TABLE_HEADER = f"{'Symbol':<12} {'LTP':<10} {'Change %':<10}\n{'-' * 40}\n"
 
 def format_json(data):
     """Pretty print JSON"""
-    return json.dumps(data, indent=2, ensure_ascii=False)
+    return _json.dumps(data, pretty=True)
 
-def display_market_status(nepse):
-    """Display market status"""
-    status = nepse.get_market_status()
-    is_open = status.get('isOpen', 'Unknown')
-    as_of = status.get('asOf', '')
-    
-    color = '\033[92m' if is_open == 'OPEN' else '\033[91m'
-    print(f"{color}Market Status: {is_open}\033[0m")
-    print(f"As of: {as_of}")
-
-def display_top_performers(nepse, limit=5):
-    """Display top gainers and losers"""
-    gainers = nepse.get_top_gainers(limit=limit)
-    losers = nepse.get_top_losers(limit=limit)
-    
-    print(f"\n\033[92mTop {limit} Gainers:\033[0m")
-    print(f"{'Symbol':<12} {'LTP':<10} {'Change %':<10}")
-    print("-" * 40)
-    for stock in gainers:
-        print(f"{stock['symbol']:<12} {stock['ltp']:<10} +{stock['percentageChange']}%")
+def format_rows(stocks, sign=''):
+    """Render performer rows as a single string (one write instead of one per row)"""
+    fmt = _ROW_FMT
+    rows = [fmt(symbol, ltp, sign, change) for symbol, ltp, change in map(_ROW_FIELDS, stocks)]
+    return "\n".join(rows) + "\n" if rows else ""
+
+async def _fetch_snapshot(nepse, limit):
+    """Fetch everything the `all` command shows in one snapshot"""
+    try:
+        return await nepse.get_snapshot(limit=limit)
+    finally:
+        await nepse.close()
+
+def _run(coro):
+    """asyncio.run, on uvloop's event loop when it is installed"""
+    try:
+        import uvloop
+    except ImportError:
+        import asyncio
+        return asyncio.run(coro)
+    return uvloop.run(coro)
+
+def _emit(data: bytes):
+    """
+    Write pre-encoded output to stdout in one call.
+    All command output goes through here exactly once, so stdout's line
+    buffering never splits it into per-line writes.
+    """
+    buffer = getattr(sys.stdout, 'buffer', None)
+    if buffer is None:
+        sys.stdout.write(data.decode('utf-8'))
+        return
+    sys.stdout.flush()
+    buffer.write(data)
+    buffer.flush()
+
+def display_market_status(status):
+    """Format market status"""
+    is_open = status['isOpen']
+    as_of = status.get('asOf', '')  # absent pre-market
     
-    print(f"\n\033[91mTop {limit} Losers:\033[0m")
-    print(f"{'Symbol':<12} {'LTP':<10} {'Change %':<10}")
-    print("-" * 40)
-    for stock in losers:
-        print(f"{stock['symbol']:<12} {stock['ltp']:<10} {stock['percentageChange']}%")
-
-def display_nepse_index(nepse):
-    """Display NEPSE index"""
-    indices = nepse.get_nepse_index()
+    color = _COLORS[is_open == 'OPEN']
+    return (
+        f"{color}Market Status: {is_open}{_RESET}\n"
+        f"As of: {as_of}\n"
+    )
+
+def display_gainers(gainers, limit=5):
+    """Format top gainers"""
+    return f"\n{_GREEN}Top {limit} Gainers:{_RESET}\n" + _TABLE_HEADER + format_rows(gainers, sign='+')
+
+def display_losers(losers, limit=5):
+    """Format top losers"""
+    return f"\n{_RED}Top {limit} Losers:{_RESET}\n" + _TABLE_HEADER + format_rows(losers)
+
+def display_top_performers(gainers, losers, limit=5):
+    """Format top gainers and losers"""
+    return display_gainers(gainers, limit) + display_losers(losers, limit)
+
+def display_nepse_index(indices):
+    """Format NEPSE index"""
     if isinstance(indices, list):
-        nepse_index = next((item for item in indices if item.get('index') == 'NEPSE Index'), indices[0])
+        by_name = {item['index']: item for item in indices}
+        nepse_index = by_name.get('NEPSE Index') or indices[0]
     else:
         nepse_index = indices
     
-    print(f"\n\033[1mNEPSE Index: {nepse_index.get('currentValue')}\033[0m")
     change = nepse_index.get('change', 0)
-    color = '\033[92m' if change > 0 else '\033[91m'
-    print(f"Change: {color}{change} ({nepse_index.get('perChange', 0)}%)\033[0m")
+    color = _COLORS[change > 0]
+    return (
+        f"\n{_BOLD}NEPSE Index: {nepse_index.get('currentValue')}{_RESET}\n"
+        f"Change: {color}{change} ({nepse_index.get('perChange', 0)}%){_RESET}\n"
+    )
+
+def display_market_summary(summary):
+    """Format market summary"""
+    if not isinstance(summary, list):
+        return "\nMarket Summary:\n" + format_json(summary) + "\n"
+    return "\nMarket Summary:\n" + "".join(
+        f"  {item['detail']}: {item['value']}\n" for item in summary
+    )
+
+def display_snapshot(snapshot, limit=5):
+    """Format the `all` snapshot"""
+    return (
+        display_market_status(snapshot['status'])
+        + display_nepse_index(snapshot['index'])
+        + display_top_performers(snapshot['gainers'], snapshot['losers'], limit=limit)
+    )
+
+# command -> handler(client, args); `all` runs on AsyncNepse, the rest on Nepse
+JSON_HANDLERS = {
+    'status': lambda n, a: n.get_market_status(),
+    'gainers': lambda n, a: n.get_top_gainers(limit=a.limit),
+    'losers': lambda n, a: n.get_top_losers(limit=a.limit),
+    'index': lambda n, a: n.get_nepse_index(),
+    'summary': lambda n, a: n.get_market_summary(),
+    'all': lambda n, a: _run(_fetch_snapshot(n, a.limit)),
+}
+
+PRETTY_HANDLERS = {
+    'status': lambda n, a: display_market_status(n.get_market_status()),
+    'gainers': lambda n, a: display_top_performers(
+        n.get_top_gainers(limit=a.limit), n.get_top_losers(limit=a.limit), limit=a.limit
+    ),
+    'losers': lambda n, a: display_losers(n.get_top_losers(limit=a.limit), a.limit),
+    'index': lambda n, a: display_nepse_index(n.get_nepse_index()),
+    'summary': lambda n, a: display_market_summary(n.get_market_summary()),
+    'all': lambda n, a: display_snapshot(_run(_fetch_snapshot(n, a.limit)), a.limit),
+}
 
 def main():
     parser = argparse.ArgumentParser(
@@ -78,68 +159,34 @@ Examples:
     
     args = parser.parse_args()
     
+    # Heavy imports deferred so --help and usage errors return quickly
+    from nepse_data_api.market import Nepse, AsyncNepse
+    
     try:
         # Initialize NEPSE interface
-        nepse = Nepse(enable_cache=not args.no_cache)
+        client = AsyncNepse if args.command == 'all' else Nepse
+        nepse = client(enable_cache=not args.no_cache)
         
         if args.json:
             # JSON output mode
-            if args.command == 'status':
-                print(format_json(nepse.get_market_status()))
-            elif args.command == 'gainers':
-                print(format_json(nepse.get_top_gainers(limit=args.limit)))
-            elif args.command == 'losers':
-                print(format_json(nepse.get_top_losers(limit=args.limit)))
-            elif args.command == 'index':
-                print(format_json(nepse.get_nepse_index()))
-            elif args.command == 'summary':
-                print(format_json(nepse.get_market_summary()))
-            elif args.command == 'all':
-                data = {
-                    'status': nepse.get_market_status(),
-                    'index': nepse.get_nepse_index(),
-                    'gainers': nepse.get_top_gainers(limit=args.limit),
-                    'losers': nepse.get_top_losers(limit=args.limit)
-                }
-                print(format_json(data))
+            data = JSON_HANDLERS[args.command](nepse, args)
+            _emit(_json.dumpb(data, pretty=True) + b"\n")
         else:
-            # Pretty output mode
-            print(f"\n{'=' * 60}")
-            print(f"  NEPSE Data - {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
-            print(f"{'=' * 60}\n")
-            
-            if args.command in ['status', 'all']:
-                display_market_status(nepse)
-            
-            if args.command in ['index', 'all']:
-                display_nepse_index(nepse)
-            
-            if args.command in ['gainers', 'all']:
-                display_top_performers(nepse, limit=args.limit)
-            elif args.command == 'losers':
-                print(f"\n\033[91mTop {args.limit} Losers:\033[0m")
-                losers = nepse.get_top_losers(limit=args.limit)
-                print(f"{'Symbol':<12} {'LTP':<10} {'Change %':<10}")
-                print("-" * 40)
-                for stock in losers:
-                    print(f"{stock['symbol']:<12} {stock['ltp']:<10} {stock['percentageChange']}%")
-            
-            if args.command == 'summary':
-                summary = nepse.get_market_summary()
-                print("\nMarket Summary:")
-                if isinstance(summary, list):
-                    for item in summary:
-                        print(f"  {item.get('detail', '')}: {item.get('value', '')}")
-                else:
-                    print(format_json(summary))
-            
-            print(f"\n{'=' * 60}\n")
+            # Pretty output mode - collect everything, write once
+            body = PRETTY_HANDLERS[args.command](nepse, args)
+            _emit((
+                f"\n{'=' * 60}\n"
+                f"  NEPSE Data - {time.strftime('%Y-%m-%d %H:%M:%S')}\n"
+                f"{'=' * 60}\n\n"
+                f"{body}"
+                f"\n{'=' * 60}\n\n"
+            ).encode('utf-8'))
         
     except KeyboardInterrupt:
         print("\nInterrupted by user")
         sys.exit(0)
     except Exception as e:
-        print(f"\033[91mError: {e}\033[0m", file=sys.stderr)
+        print(f"{_RED}Error: {e}{_RESET}", file=sys.stderr)
         sys.exit(1)
 
 if __name__ == "__main__":
@@ -5,112 +5,367 @@ nepse-data - High-performance NEPSE Library
 High-performance Python library for Nepal Stock Exchange (NEPSE) data.
 """
 
+import logging
+import os
+import sys
 import requests
-import pywasm
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import time
 import json
+import heapq
+import threading
+import weakref
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, date, timedelta
 import pathlib
 from typing import Optional, Dict, Any, List
 from functools import lru_cache
+from itertools import chain
 import asyncio
 import aiohttp
 import websockets
 import urllib3
 
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from . import _json
+from .security import NepseTokenParser
+
+log = logging.getLogger(__name__)
+
+# Failures a single request can raise (transport errors, undecodable JSON);
+# anything else is a bug and is not swallowed by the page loops
+_REQUEST_ERRORS = (requests.RequestException, ValueError)
+_ASYNC_REQUEST_ERRORS = (aiohttp.ClientError, asyncio.TimeoutError, ValueError)
+
+# Python 3.12.7 and 3.13.1 fixed the SSL transport leak aiohttp's
+# enable_cleanup_closed works around; aiohttp deprecates it from there on
+_NEEDS_CLEANUP_CLOSED = sys.version_info < (3, 12, 7) or (3, 13, 0) <= sys.version_info < (3, 13, 1)
+
 # Suppress SSL warnings
 urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
 
 class CacheManager:
-    """Simple caching layer to avoid repeated API calls"""
+    """
+    Simple caching layer to avoid repeated API calls.
+    Entries expire after their TTL; the least recently used entry is
+    evicted once max_entries is reached.
+    """
+    
+    __slots__ = ("_cache", "_expiry_heap", "_sets_since_sweep", "_lock", "default_ttl", "max_entries")
+    
+    # Expired entries are swept in one batch every this many set() calls
+    SWEEP_INTERVAL = 64
     
-    def __init__(self, default_ttl: int = 30):
-        self._cache: Dict[str, tuple[Any, float]] = {}
+    def __init__(self, default_ttl: int = 30, max_entries: int = 1024):
+        self._cache: "OrderedDict[str, tuple[Any, float]]" = OrderedDict()
+        self._expiry_heap: List[tuple] = []
+        self._sets_since_sweep = 0
+        self._lock = threading.Lock()
         self.default_ttl = default_ttl
+        self.max_entries = max_entries
     
     def get(self, key: str) -> Optional[Any]:
         """Get cached value if not expired"""
-        if key in self._cache:
-            value, expires_at = self._cache[key]
-            if time.time() < expires_at:
+        with self._lock:
+            entry = self._cache.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if time.monotonic() < expires_at:
+                self._cache.move_to_end(key)
                 return value
-            else:
-                del self._cache[key]
-        return None
+            del self._cache[key]
+            return None
     
     def set(self, key: str, value: Any, ttl: Optional[int] = None):
         """Store value with expiration"""
         ttl = ttl or self.default_ttl
-        expires_at = time.time() + ttl
-        self._cache[key] = (value, expires_at)
+        expires_at = time.monotonic() + ttl
+        with self._lock:
+            cache = self._cache
+            cache[key] = (value, expires_at)
+            cache.move_to_end(key)
+            if len(cache) > self.max_entries:
+                cache.popitem(last=False)
+            
+            heapq.heappush(self._expiry_heap, (expires_at, key))
+            self._sets_since_sweep += 1
+            if self._sets_since_sweep >= self.SWEEP_INTERVAL:
+                self._sweep()
+    
+    def _sweep(self):
+        """Drop every expired entry (caller holds the lock)"""
+        self._sets_since_sweep = 0
+        now = time.monotonic()
+        cache, heap = self._cache, self._expiry_heap
+        while heap and heap[0][0] <= now:
+            expires_at, key = heapq.heappop(heap)
+            entry = cache.get(key)
+            # Skip keys that were re-set (new expiry) or already evicted
+            if entry is not None and entry[1] == expires_at:
+                del cache[key]
+        # Re-set and evicted keys leave stale heap entries; rebuild if they pile up
+        if len(heap) > 2 * self.max_entries:
+            self._expiry_heap = [(expires_at, key) for key, (_, expires_at) in cache.items()]
+            heapq.heapify(self._expiry_heap)
     
     def clear(self):
         """Clear all cached data"""
-        self._cache.clear()
+        with self._lock:
+            self._cache.clear()
+            self._expiry_heap.clear()
+            self._sets_since_sweep = 0
+
+# Seconds an access token stays valid on the NEPSE side
+_TOKEN_TTL = 45
+
+# Only reuse a token this fresh, so it keeps most of its life for the new client
+_TOKEN_REUSE_WINDOW = 10
+
+# Tokens parsed by any client in this process, keyed by base URL, so a
+# Nepse and an AsyncNepse side by side share one prove round trip:
+# {base_url: (monotonic obtained_at, time.time() obtained_at, access_token, refresh_token, salts)}
+_shared_token_cache: Dict[str, tuple] = {}
+_shared_token_lock = threading.Lock()
+# AsyncNepse instances serialize their prove round trips per event loop
+_async_token_locks = weakref.WeakKeyDictionary()
+
+
+def _shared_token(base_url: str) -> Optional[tuple]:
+    """
+    (obtained_at, access_token, refresh_token, salts) if a client got a token
+    in the last _TOKEN_REUSE_WINDOW seconds, else None. obtained_at is a
+    time.time() timestamp.
+    """
+    entry = _shared_token_cache.get(base_url)
+    if entry is not None and time.monotonic() - entry[0] < _TOKEN_REUSE_WINDOW:
+        return entry[1:]
+    return None
+
 
-class NepseTokenParser:
-    """Handles the WASM-based token decryption logic"""
+def _share_token(base_url: str, tokens: tuple) -> tuple:
+    """Publish freshly parsed tokens; returns them in _shared_token's form"""
+    entry = _shared_token_cache[base_url] = (time.monotonic(), time.time(), *tokens)
+    return entry[1:]
+
+
+def _async_token_lock() -> asyncio.Lock:
+    """Lock for AsyncNepse token fetches in the running event loop"""
+    loop = asyncio.get_running_loop()
+    lock = _async_token_locks.get(loop)
+    if lock is None:
+        lock = _async_token_locks[loop] = asyncio.Lock()
+    return lock
+
+
+class TokenBucket:
+    """
+    Thread-safe token-bucket rate limiter.
+    Up to `capacity` calls go through back-to-back; after that calls are
+    spaced to `rate` per second.
+    """
     
-    def __init__(self):
-        # Update path to use package relative location
-        import os
-        base_dir = pathlib.Path(__file__).parent
-        wasm_path = base_dir / "assets" / "css.wasm"
-        
-        self.runtime = pywasm.core.Runtime()
-        self.wasm_module = self.runtime.instance_from_file(str(wasm_path))
-        
-    def parse_token_response(self, response_data):
-        """Reverse-engineered logic to descramble the token using WASM"""
-        try:
-            salts = [
-                int(response_data["salt1"]),
-                int(response_data["salt2"]),
-                int(response_data["salt3"]),
-                int(response_data["salt4"]),
-                int(response_data["salt5"]),
-            ]
-        except (KeyError, ValueError, TypeError) as e:
-            raise ValueError(f"Invalid salt data in response: {e}")
-
-        # Calculate indices for Access Token
-        n = self.runtime.invocate(self.wasm_module, "cdx", salts)[0]
-        l_index = self.runtime.invocate(self.wasm_module, "rdx", [salts[0], salts[1], salts[3], salts[2], salts[4]])[0]
-        o = self.runtime.invocate(self.wasm_module, "bdx", [salts[0], salts[1], salts[3], salts[2], salts[4]])[0]
-        p = self.runtime.invocate(self.wasm_module, "ndx", [salts[0], salts[1], salts[3], salts[2], salts[4]])[0]
-        q = self.runtime.invocate(self.wasm_module, "mdx", [salts[0], salts[1], salts[3], salts[2], salts[4]])[0]
-        
-        # Calculate indices for Refresh Token
-        salts_reversed = [salts[1], salts[0], salts[2], salts[4], salts[3]]
-        a = self.runtime.invocate(self.wasm_module, "cdx", salts_reversed)[0]
-        b = self.runtime.invocate(self.wasm_module, "rdx", [salts[1], salts[0], salts[2], salts[3], salts[4]])[0]
-        c = self.runtime.invocate(self.wasm_module, "bdx", [salts[1], salts[0], salts[3], salts[2], salts[4]])[0]
-        d = self.runtime.invocate(self.wasm_module, "ndx", [salts[1], salts[0], salts[3], salts[2], salts[4]])[0]
-        e = self.runtime.invocate(self.wasm_module, "mdx", [salts[1], salts[0], salts[3], salts[2], salts[4]])[0]
-        
-        # Extract and descramble tokens
-        access_token = response_data["accessToken"]
-        refresh_token = response_data["refreshToken"]
-        
-        parsed_access_token = (
-            access_token[0:n]
-            + access_token[n + 1 : l_index]
-            + access_token[l_index + 1 : o]
-            + access_token[o + 1 : p]
-            + access_token[p + 1 : q]
-            + access_token[q + 1 :]
-        )
-        
-        parsed_refresh_token = (
-            refresh_token[0:a]
-            + refresh_token[a + 1 : b]
-            + refresh_token[b + 1 : c]
-            + refresh_token[c + 1 : d]
-            + refresh_token[d + 1 : e]
-            + refresh_token[e + 1 :]
-        )
-        
-        return parsed_access_token, parsed_refresh_token, salts
+    __slots__ = ("rate", "capacity", "_tokens", "_last_refill", "_lock")
+    
+    def __init__(self, rate: float, capacity: int):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = float(capacity)
+        self._last_refill = time.monotonic()
+        self._lock = threading.Lock()
+    
+    def reserve(self) -> float:
+        """Take one token; return how many seconds to wait before using it"""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._last_refill) * self.rate)
+            self._last_refill = now
+            # Tokens may go negative: each waiter is queued behind the previous one
+            self._tokens -= 1
+            return 0.0 if self._tokens >= 0 else -self._tokens / self.rate
+    
+    def acquire(self):
+        """Block until a token is available"""
+        delay = self.reserve()
+        if delay:
+            time.sleep(delay)
+
+
+# (valid_until, date) for _today(), on the monotonic clock
+_today_cache = (0.0, None)
+
+
+def _today() -> date:
+    """date.today(), re-read at most once a minute and always at midnight"""
+    global _today_cache
+    valid_until, today = _today_cache
+    now = time.monotonic()
+    if now >= valid_until:
+        wall = datetime.now()
+        today = wall.date()
+        until_midnight = (datetime.combine(today + timedelta(days=1), datetime.min.time()) - wall).total_seconds()
+        _today_cache = (now + min(60.0, until_midnight), today)
+    return today
+
+
+# Symbol -> security id map, persisted per day so new processes skip the fetch
+_SECURITY_MAP_DIR = pathlib.Path.home() / ".cache" / "nepse"
+
+
+def _security_map_path() -> pathlib.Path:
+    return _SECURITY_MAP_DIR / f"security_map.{_today().isoformat()}.json"
+
+
+def _load_security_map() -> Dict[str, int]:
+    """Today's persisted security map, or {} if there is none (or it is unreadable)"""
+    try:
+        data = _json.loads(_security_map_path().read_bytes())
+    except (OSError, ValueError):
+        return {}
+    return data if isinstance(data, dict) else {}
+
+
+def _save_security_map(security_map: Dict[str, int]):
+    """Persist today's security map (best effort) and drop earlier days' files"""
+    path = _security_map_path()
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # Write then rename, so concurrent processes never read a partial file
+        tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+        tmp.write_bytes(_json.dumpb(security_map))
+        tmp.replace(path)
+        for old in path.parent.glob("security_map.*.json"):
+            if old != path:
+                old.unlink()
+    except OSError as e:
+        log.warning("Could not persist security map: %s", e)
+
+
+def _security_ids_needed(security_map: Dict[str, int], from_disk: bool, symbols) -> bool:
+    """
+    True if the map must be (re)fetched: it is empty, or it is a persisted
+    copy missing one of `symbols` (e.g. listed after the file was written)
+    """
+    if not security_map:
+        return True
+    return from_disk and any(s not in security_map for s in symbols)
+
+
+@lru_cache(maxsize=4096)
+def _parse_ymd(value: str) -> datetime:
+    """Parse a YYYY-MM-DD date; memoized, and cheaper than strptime on a miss"""
+    year, month, day = value.split('-')
+    return datetime(int(year), int(month), int(day))
+
+
+def _floorsheet_last_page(first: Dict[str, Any], page: int, limit: int, size: int) -> int:
+    """
+    Last page to request after the first one (`page`); `page` itself if
+    there is nothing more. `limit` > 0 caps the number of pages.
+    """
+    # A short page is the last one, whatever totalPages says
+    if len(first.get('content', [])) < size:
+        return page
+    last_page = first.get('totalPages', 1) - 1
+    if limit > 0:
+        last_page = min(last_page, page + limit - 1)
+    return last_page
+
+
+def _merge_floorsheet_pages(content: List[Dict], results, size: int, errors: tuple) -> List[Dict]:
+    """
+    Append the remaining pages to the first page's `content`.
+    
+    `results` yields (page_no, sheet) in page order, where sheet is a
+    response dict or the exception raised fetching it. Merging stops at
+    the first failed (`errors`), empty or short page; other exceptions
+    are re-raised.
+    """
+    # Collect page lists and flatten once instead of growing one list per page
+    pages = [content]
+    for page_no, sheet in results:
+        if isinstance(sheet, errors):
+            log.error("Error fetching floorsheet page %s: %s", page_no, sheet)
+            break
+        if isinstance(sheet, BaseException):
+            raise sheet
+        content = sheet.get('content', [])
+        if not content:
+            break
+        pages.append(content)
+        if len(content) < size:
+            break
+    return list(chain.from_iterable(pages))
+
+
+def _filter_bars(bars: List[Dict], start_ts: int, end_ts: int) -> List[Dict]:
+    """Keep chart bars whose 't' timestamp lies in [start_ts, end_ts]"""
+    if np is None:
+        return [d for d in bars if 't' in d and start_ts <= d['t'] <= end_ts]
+    
+    # Bars without a timestamp get -1 and fall outside any real range
+    ts = np.fromiter((d.get('t', -1) for d in bars), dtype=np.int64, count=len(bars))
+    mask = (ts >= start_ts) & (ts <= end_ts)
+    return [bars[i] for i in np.flatnonzero(mask)]
+
+
+# Fixed NEPSE endpoints (paths without per-call parameters)
+_ENDPOINTS = {
+    "prove": "/api/authenticate/prove",
+    "refresh_token": "/api/authenticate/refresh-token",
+    "market_status": "/api/nots/nepse-data/market-open",
+    "market_summary": "/api/nots/market-summary/",
+    "nepse_index": "/api/nots/nepse-index",
+    "indices": "/api/nots/index",
+    "sub_indices": "/api/nots",
+    "sectors": "/api/nots/sector",
+    "live_market": "/api/nots/lives-market",
+    "price_volume": "/api/nots/securityDailyTradeStat/58",
+    "marcap": "/api/nots/nepse-data/marcapbydate/",
+    "top_gainers": "/api/nots/top-ten/top-gainer?all=false",
+    "top_losers": "/api/nots/top-ten/top-loser?all=false",
+    "top_turnover": "/api/nots/top-ten/turnover?all=false",
+    "top_trade": "/api/nots/top-ten/trade?all=false",
+    "top_transaction": "/api/nots/top-ten/transaction?all=false",
+    "company_list": "/api/nots/company/list",
+    "security_list": "/api/nots/security?nonDelisted=true",
+    "promoters": "/api/nots/security/promoters",
+    "news_alerts": "/api/nots/news/media/news-and-alerts",
+    "press_releases": "/api/nots/news/press-release",
+    "floorsheet": "/api/nots/nepse-data/floorsheet",
+}
+
+
+def _urls(base_url: str) -> Dict[str, str]:
+    """Absolute URLs for _ENDPOINTS, built once per client class"""
+    return {name: base_url + path for name, path in _ENDPOINTS.items()}
+
+
+# NEPSE's embedded lookup table for payload ids, indexed by market id % 100
+_DUMMY_DATA = (
+    147, 117, 239, 143, 157, 312, 161, 612, 512, 804, 411, 527, 170, 511, 421, 667, 764, 621, 301, 106,
+    133, 793, 411, 511, 312, 423, 344, 346, 653, 758, 342, 222, 236, 811, 711, 611, 122, 447, 128, 199,
+    183, 135, 489, 703, 800, 745, 152, 863, 134, 211, 142, 564, 375, 793, 212, 153, 138, 153, 648, 611,
+    151, 649, 318, 143, 117, 756, 119, 141, 717, 113, 112, 146, 162, 660, 693, 261, 362, 354, 251, 641,
+    157, 178, 631, 192, 734, 445, 192, 883, 187, 122, 591, 731, 852, 384, 565, 596, 451, 772, 624, 691,
+)
+
+
+@lru_cache(maxsize=2048)
+def _payload_id(dummy_id: int, day: int, salts: tuple) -> int:
+    """Pure part of the floorsheet/today-price payload id, memoized per (market id, day, salts)"""
+    e = _DUMMY_DATA[dummy_id % len(_DUMMY_DATA)] + dummy_id + 2 * day
+    
+    # Salt Logic
+    salt_index = 1 if e % 10 < 4 else 3
+    return int(e + salts[salt_index] * day - salts[salt_index - 1])
+
 
 class Nepse:
     """
@@ -125,18 +380,40 @@ class Nepse:
     """
     
     BASE_URL = "https://www.nepalstock.com.np"
+    _URLS = _urls(BASE_URL)
+    TOKEN_TTL = _TOKEN_TTL
     
-    def __init__(self, cache_ttl: int = 30, enable_cache: bool = True):
+    def __init__(self, cache_ttl: int = 30, enable_cache: bool = True, http2: bool = False,
+                 auto_refresh: bool = False):
         """
         Initialize with optional caching
         
         Args:
             cache_ttl: Cache time-to-live in seconds (default: 30)
             enable_cache: Enable/disable caching (default: True)
+            http2: Use an httpx HTTP/2 client instead of requests, multiplexing
+                   all calls over one connection (requires `httpx[http2]`)
+            auto_refresh: Refresh the access token in a background thread before
+                          it expires, so requests never wait on re-authentication.
+                          Call close() to stop it (default: False)
         """
-        self.session = requests.Session()
-        self.token_parser = NepseTokenParser()
+        self.session = self._create_http2_client() if http2 else requests.Session()
+        self._request_errors = _REQUEST_ERRORS
+        if http2:
+            import httpx
+            self._request_errors += (httpx.HTTPError,)
+        self.token_parser = NepseTokenParser.get()
         self.cache = CacheManager(cache_ttl) if enable_cache else None
+        # In-process memo for internal lookups, kept even when caching is disabled
+        self._memo = CacheManager(60)
+        # url -> (etag, last_modified, body) for conditional GETs
+        self._etag_cache = {}
+        self.security_id_map = {}
+        self._security_map_from_disk = False
+        self._security_ids_lock = threading.Lock()
+        # Floorsheet page pacing; the whole-market endpoint is more sensitive
+        self._floorsheet_bucket = TokenBucket(rate=5.0, capacity=10)
+        self._market_floorsheet_bucket = TokenBucket(rate=1.5, capacity=3)
         
         # State
         self.access_token = None
@@ -145,7 +422,6 @@ class Nepse:
         self.token_timestamp = 0
         
         # Configure session
-        self.session.verify = False
         self.session.headers.update({
             "User-Agent": "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36",
             "Content-Type": "application/json",
@@ -153,103 +429,254 @@ class Nepse:
             "Origin": self.BASE_URL
         })
         
+        if not http2:
+            self.session.verify = False
+            self.session.headers["Connection"] = "keep-alive"
+            # Keep-alive pool sized for parallel floorsheet pages, so bursts
+            # reuse TLS connections instead of discarding them
+            adapter = HTTPAdapter(
+                pool_connections=16,
+                pool_maxsize=32,
+                max_retries=Retry(total=3, backoff_factor=0.2, status_forcelist=[502, 503, 504], raise_on_status=False)
+            )
+            self.session.mount("https://", adapter)
+        
         # Auto-authenticate
         self.authenticate()
+        
+        self._stop_refresh = threading.Event()
+        self._refresh_thread = None
+        if auto_refresh:
+            self._refresh_thread = threading.Thread(
+                target=self._token_keeper, name="nepse-token-keeper", daemon=True
+            )
+            self._refresh_thread.start()
 
-    def authenticate(self):
-        """Fetch and process the scrambled token"""
-        url = f"{self.BASE_URL}/api/authenticate/prove"
-        response = self.session.get(url)
-        response.raise_for_status()
-        data = response.json()
+    def _token_keeper(self):
+        """Renew the access token shortly before it expires, until close()"""
+        # Wait until 10s before the current token expires; a reused one is already aged
+        while not self._stop_refresh.wait(
+                max(1, self.TOKEN_TTL - 10 - (time.time() - self.token_timestamp))):
+            try:
+                # A full re-authentication descrambles the new token and salts
+                # and shares them; the access_token setter swaps in fresh headers
+                self.authenticate(force=True)
+            except Exception as e:
+                log.error("Error refreshing token in background: %s", e)
+
+    def close(self):
+        """Stop the background token refresh and close the HTTP session"""
+        self._stop_refresh.set()
+        if self._refresh_thread is not None:
+            self._refresh_thread.join()
+            self._refresh_thread = None
+        self.session.close()
+
+    @staticmethod
+    def _create_http2_client():
+        """httpx client with HTTP/2; exposes the same get/post/headers API we use"""
+        try:
+            import httpx
+        except ImportError:
+            raise ImportError("http2=True requires httpx: pip install 'nepse-data-api[http2]'")
+        return httpx.Client(
+            http2=True,
+            verify=False,
+            follow_redirects=True,
+            # No timeout, like the requests transport; slow floorsheet pages
+            # would trip httpx's 5s default
+            timeout=None,
+            limits=httpx.Limits(max_connections=16, max_keepalive_connections=16)
+        )
+
+    def authenticate(self, force: bool = False):
+        """
+        Fetch and process the scrambled token
         
-        self.access_token, self.refresh_token, self.salts = \
-            self.token_parser.parse_token_response(data)
-        self.token_timestamp = int(time.time())
+        Args:
+            force: Always request a new token instead of reusing one another
+                   client in this process obtained in the last few seconds
+        """
+        with _shared_token_lock:
+            entry = None if force else _shared_token(self.BASE_URL)
+            if entry is None:
+                url = self._URLS["prove"]
+                response = self.session.get(url)
+                response.raise_for_status()
+                data = self._parse(response)
+                tokens = self.token_parser.parse_token_response(data)
+                entry = _share_token(self.BASE_URL, tokens)
+        
+        # A reused token is as old as when the other client obtained it
+        obtained_at, self.access_token, self.refresh_token, self.salts = entry
+        self.token_timestamp = int(obtained_at)
+
+    @property
+    def access_token(self):
+        return self._access_token
+
+    @access_token.setter
+    def access_token(self, value):
+        self._access_token = value
+        self._auth_headers = None  # rebuilt for the new token on next use
 
     def _get_auth_headers(self):
-        """Construct headers with Salter authorization"""
+        """
+        Headers with Salter authorization, built once per token.
+        Shared between calls - copy before modifying.
+        """
         if not self.access_token:
             self.authenticate()
-        return {
+        return self._auth_headers or self._build_auth_headers()
+
+    def _build_auth_headers(self):
+        """Construct headers with Salter authorization"""
+        self._auth_headers = {
             "Authorization": f"Salter {self.access_token}",
             "Content-Type": "application/json",
             "User-Agent": self.session.headers["User-Agent"]
         }
+        return self._auth_headers
+
+    @staticmethod
+    def _parse(response):
+        """Decode a JSON response body with the fastest available parser"""
+        return _json.loads(response.content)
+
+    def _conditional_get(self, url: str):
+        """
+        GET that revalidates with If-None-Match/If-Modified-Since.
+        A 304 returns the body kept from the last 200 response.
+        """
+        entry = self._etag_cache.get(url)
+        headers = self._get_auth_headers()
+        if entry:
+            headers = dict(headers)
+            if entry[0]:
+                headers["If-None-Match"] = entry[0]
+            if entry[1]:
+                headers["If-Modified-Since"] = entry[1]
+        
+        response = self.session.get(url, headers=headers)
+        if response.status_code == 304 and entry:
+            return entry[2]
+        response.raise_for_status()
+        data = self._parse(response)
+        
+        etag = response.headers.get("ETag")
+        last_modified = response.headers.get("Last-Modified")
+        if etag or last_modified:
+            self._etag_cache[url] = (etag, last_modified, data)
+        return data
 
-    def _cached_get(self, cache_key: str, url: str, ttl: Optional[int] = None):
-        """Get with caching support"""
+    def _cached_get(self, cache_key: str, url: str, ttl: Optional[int] = None,
+                    conditional: bool = False):
+        """Get with caching support, revalidating expired entries if conditional"""
         if self.cache:
             cached = self.cache.get(cache_key)
             if cached is not None:
                 return cached
         
-        response = self.session.get(url, headers=self._get_auth_headers())
-        response.raise_for_status()
-        data = response.json()
+        if conditional:
+            data = self._conditional_get(url)
+        else:
+            response = self.session.get(url, headers=self._get_auth_headers())
+            response.raise_for_status()
+            data = self._parse(response)
         
         if self.cache:
             self.cache.set(cache_key, data, ttl)
         
         return data
 
+    def _current_market_status(self):
+        """
+        Market status for internal lookups (payload IDs, business date).
+        Memoized even with enable_cache=False so one public call never
+        fetches the status more than once.
+        """
+        status = self._memo.get("market_status")
+        if status is None:
+            status = self.get_market_status()
+            self._memo.set("market_status", status)
+        return status
+
+    def _market_id(self):
+        """
+        Market status id used for payload ids. It changes at most once a
+        session, so it is kept for 5 minutes and dropped at the date change.
+        """
+        key = f"market_id_{_today()}"
+        market_id = self._memo.get(key)
+        if market_id is None:
+            market_id = int(self._current_market_status().get('id', 147))
+            self._memo.set(key, market_id, ttl=300)
+        return market_id
+
     # Core API methods with caching
     
     def get_market_status(self, use_cache: bool = True):
         """Get market open/close status (cached for 60s)"""
-        url = f"{self.BASE_URL}/api/nots/nepse-data/market-open"
+        url = self._URLS["market_status"]
         if use_cache and self.cache:
             return self._cached_get("market_status", url, ttl=60)
         
         response = self.session.get(url, headers=self._get_auth_headers())
         response.raise_for_status()
-        return response.json()
+        status = self._parse(response)
+        # Share with internal lookups (today-price business date, payload ids)
+        self._memo.set("market_status", status)
+        return status
 
     def get_market_summary(self, use_cache: bool = True):
         """Get market summary (cached for 30s)"""
-        url = f"{self.BASE_URL}/api/nots/market-summary/"
+        url = self._URLS["market_summary"]
         if use_cache and self.cache:
-            return self._cached_get("market_summary", url)
+            return self._cached_get("market_summary", url, conditional=True)
         
-        response = self.session.get(url, headers=self._get_auth_headers())
-        response.raise_for_status()
-        return response.json()
+        return self._conditional_get(url)
         
     def get_top_gainers(self, limit: Optional[int] = None, use_cache: bool = True):
         """Get top gainers (cached for 30s)"""
-        url = f"{self.BASE_URL}/api/nots/top-ten/top-gainer?all=false"
+        url = self._URLS["top_gainers"]
         if use_cache and self.cache:
             data = self._cached_get("top_gainers", url)
         else:
             response = self.session.get(url, headers=self._get_auth_headers())
-            data = response.json()
+            if limit:
+                # Only the first `limit` rows are returned - don't build the rest
+                return _json.loads_head(response.content, limit)
+            data = self._parse(response)
         
         return data[:limit] if limit else data
     
     def get_top_losers(self, limit: Optional[int] = None, use_cache: bool = True):
         """Get top losers (cached for 30s)"""
-        url = f"{self.BASE_URL}/api/nots/top-ten/top-loser?all=false"
+        url = self._URLS["top_losers"]
         if use_cache and self.cache:
             data = self._cached_get("top_losers", url)
         else:
             response = self.session.get(url, headers=self._get_auth_headers())
-            data = response.json()
+            if limit:
+                # Only the first `limit` rows are returned - don't build the rest
+                return _json.loads_head(response.content, limit)
+            data = self._parse(response)
         
         return data[:limit] if limit else data
     
     def get_nepse_index(self, use_cache: bool = True):
         """Get NEPSE index data (cached for 30s)"""
-        url = f"{self.BASE_URL}/api/nots/nepse-index"
+        url = self._URLS["nepse_index"]
         if use_cache and self.cache:
             return self._cached_get("nepse_index", url)
         
         try:
             response = self.session.get(url, headers=self._get_auth_headers())
             response.raise_for_status()
-            return response.json()
+            return self._parse(response)
         except Exception as e:
             # Handle empty or invalid JSON response
-            print(f"Error fetching NEPSE index: {e}")
+            log.error("Error fetching NEPSE index: %s", e)
             return {}
 
     def get_today_price(self, size: int = 500, date: str = None, use_cache: bool = True):
@@ -285,7 +712,7 @@ class Nepse:
             payload_date = None
             if date:
                 try:
-                    payload_date = datetime.strptime(date, "%Y-%m-%d")
+                    payload_date = _parse_ymd(date)
                 except Exception:
                     # Fallback to now if date format is invalid
                     payload_date = datetime.now()
@@ -293,14 +720,14 @@ class Nepse:
                 # If no date provided, use the market "asOf" date to ensure we get data
                 # calling get_market_status to find the last trading day
                 try:
-                    status = self.get_market_status()
+                    status = self._current_market_status()
                     if status and 'asOf' in status:
                         # asOf format: 2026-02-12T15:00:00
                         as_of_str = status['asOf'].split('T')[0]
-                        payload_date = datetime.strptime(as_of_str, "%Y-%m-%d")
+                        payload_date = _parse_ymd(as_of_str)
                 except Exception as e:
                     # Fallback to now
-                    print(f"Error fetching market status date: {e}")
+                    log.error("Error fetching market status date: %s", e)
                     payload_date = datetime.now()
             
             if not payload_date:
@@ -317,7 +744,7 @@ class Nepse:
             response.raise_for_status()
             
             # API returns direct array (not wrapped in {content: []})
-            data = response.json()
+            data = self._parse(response)
             
             if self.cache:
                 self.cache.set(cache_key, data, ttl=15)  # Short TTL for live data
@@ -325,7 +752,7 @@ class Nepse:
             return data if isinstance(data, list) else []
             
         except Exception as e:
-            print(f"Error fetching today price: {e}")
+            log.error("Error fetching today price: %s", e)
             return []
 
     def get_stocks(self, date: str = None, use_cache: bool = True):
@@ -336,7 +763,7 @@ class Nepse:
         """
         if not date:
             # Live market - fast, reliable, works 24/7
-            url = f"{self.BASE_URL}/api/nots/lives-market"
+            url = self._URLS["live_market"]
             cache_key = "live_market"
             
             if use_cache and self.cache:
@@ -347,14 +774,14 @@ class Nepse:
             try:
                 response = self.session.get(url, headers=self._get_auth_headers())
                 response.raise_for_status()
-                stocks = response.json()
+                stocks = self._parse(response)
                 
                 if self.cache:
                     self.cache.set(cache_key, stocks, ttl=15)
                     
                 return stocks
             except Exception as e:
-                print(f"Error: {e}")
+                log.error("Error: %s", e)
                 return []
         else:
             # Historical data
@@ -367,23 +794,31 @@ class Nepse:
         # Fixed endpoint: /api/nots/securityDailyTradeDto/business-date/{date}
         # Fixed params: size & page
         url = f"{self.BASE_URL}/api/nots/securityDailyTradeDto/business-date/{date}?size={size}&page=0"
+        cache_key = f"daily_trade_{date}_{size}"
         
         if use_cache and self.cache:
-            return self._cached_get(f"daily_trade_{date}", url)
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                return cached
         
         try:
             response = self.session.get(url, headers=self._get_auth_headers())
             
-            # If 404, it might mean no data for that specific date (holiday?), try previous day? 
-            # But let's just return empty for now to avoid loop
+            # 404 means no trading on that date (holiday/weekend); that won't
+            # change, so cache the empty result to keep date-walking loops cheap
             if response.status_code == 404:
-                print(f"No data found for date: {date}")
+                log.warning("No data found for date: %s", date)
+                if self.cache:
+                    self.cache.set(cache_key, [], ttl=86400)
                 return []
                 
             response.raise_for_status()
-            return response.json().get('content', [])
+            trades = self._parse(response).get('content', [])
+            if self.cache:
+                self.cache.set(cache_key, trades)
+            return trades
         except Exception as e:
-            print(f"Error fetching daily trade for {date}: {e}")
+            log.error("Error fetching daily trade for %s: %s", date, e)
             return []
     
     def get_price_volume(self, use_cache: bool = True):
@@ -391,7 +826,7 @@ class Nepse:
         Get daily price/volume for all securities (Market Stats)
         Endpoint: /api/nots/securityDailyTradeStat/58
         """
-        url = f"{self.BASE_URL}/api/nots/securityDailyTradeStat/58"
+        url = self._URLS["price_volume"]
         
         # This endpoint updates frequently when market is open
         ttl = 15 if use_cache else 0
@@ -402,9 +837,9 @@ class Nepse:
         try:
             response = self.session.get(url, headers=self._get_auth_headers())
             response.raise_for_status()
-            return response.json()
+            return self._parse(response)
         except Exception as e:
-            print(f"Error fetching price volume: {e}")
+            log.error("Error fetching price volume: %s", e)
             return []
 
     def get_sub_indices(self, use_cache: bool = True):
@@ -415,35 +850,33 @@ class Nepse:
             List of sector indices with:
             - index name, close, high, low, previousClose (open approx)
         """
-        url = f"{self.BASE_URL}/api/nots"
+        url = self._URLS["sub_indices"]
         
         if use_cache and self.cache:
-            return self._cached_get("sub_indices", url, ttl=30)
+            return self._cached_get("sub_indices", url, ttl=30, conditional=True)
         
         try:
-            response = self.session.get(url, headers=self._get_auth_headers())
-            response.raise_for_status()
-            return response.json()
+            return self._conditional_get(url)
         except Exception as e:
-            print(f"Error fetching sub-indices: {e}")
+            log.error("Error fetching sub-indices: %s", e)
             return []
 
     # --- TOP Performers ---
 
     def get_top_turnover(self, use_cache: bool = True):
         """Get top 10 stocks by turnover"""
-        url = f"{self.BASE_URL}/api/nots/top-ten/turnover?all=false"
-        return self._cached_get("top_turnover", url, ttl=30) if use_cache else self.session.get(url, headers=self._get_auth_headers()).json()
+        url = self._URLS["top_turnover"]
+        return self._cached_get("top_turnover", url, ttl=30) if use_cache else self._parse(self.session.get(url, headers=self._get_auth_headers()))
 
     def get_top_trade(self, use_cache: bool = True):
         """Get top 10 stocks by number of trades"""
-        url = f"{self.BASE_URL}/api/nots/top-ten/trade?all=false"
-        return self._cached_get("top_trade", url, ttl=30) if use_cache else self.session.get(url, headers=self._get_auth_headers()).json()
+        url = self._URLS["top_trade"]
+        return self._cached_get("top_trade", url, ttl=30) if use_cache else self._parse(self.session.get(url, headers=self._get_auth_headers()))
 
     def get_top_transaction(self, use_cache: bool = True):
         """Get top 10 stocks by number of transactions"""
-        url = f"{self.BASE_URL}/api/nots/top-ten/transaction?all=false"
-        return self._cached_get("top_transaction", url, ttl=30) if use_cache else self.session.get(url, headers=self._get_auth_headers()).json()
+        url = self._URLS["top_transaction"]
+        return self._cached_get("top_transaction", url, ttl=30) if use_cache else self._parse(self.session.get(url, headers=self._get_auth_headers()))
 
     # --- Market Metadata ---
 
@@ -458,7 +891,7 @@ class Nepse:
         Returns:
             List of market capitalization records
         """
-        url = f"{self.BASE_URL}/api/nots/nepse-data/marcapbydate/"
+        url = self._URLS["marcap"]
         if date:
             url += f"?date={date}"
             
@@ -470,25 +903,27 @@ class Nepse:
         try:
             response = self.session.get(url, headers=self._get_auth_headers())
             response.raise_for_status()
-            data = response.json()
+            data = self._parse(response)
             
             if self.cache and use_cache:
                 self.cache.set(cache_key, data, ttl=3600)
                 
             return data
         except Exception as e:
-            print(f"Error fetching market cap data: {e}")
+            log.error("Error fetching market cap data: %s", e)
             return []
 
     def get_company_list(self, use_cache: bool = True):
         """Get list of all listed companies"""
-        url = f"{self.BASE_URL}/api/nots/company/list"
-        return self._cached_get("company_list", url, ttl=3600) if use_cache else self.session.get(url, headers=self._get_auth_headers()).json()
+        url = self._URLS["company_list"]
+        return self._cached_get("company_list", url, ttl=3600) if use_cache else self._parse(self.session.get(url, headers=self._get_auth_headers()))
 
     def get_security_list(self, use_cache: bool = True):
         """Get list of all securities (non-delisted)"""
-        url = f"{self.BASE_URL}/api/nots/security?nonDelisted=true"
-        return self._cached_get("security_list", url, ttl=3600) if use_cache else self.session.get(url, headers=self._get_auth_headers()).json()
+        url = self._URLS["security_list"]
+        if use_cache:
+            return self._cached_get("security_list", url, ttl=3600, conditional=True)
+        return self._conditional_get(url)
 
     def get_promoter_list(self, use_cache: bool = True):
         """
@@ -503,7 +938,7 @@ class Nepse:
                 
         all_promoters = []
         current_page = 0
-        endpoint = f"{self.BASE_URL}/api/nots/security/promoters"
+        endpoint = self._URLS["promoters"]
         
         try:
             while True:
@@ -511,7 +946,7 @@ class Nepse:
                 response = self.session.get(url, headers=self._get_auth_headers())
                 response.raise_for_status()
                 
-                data = response.json()
+                data = self._parse(response)
                 content = data.get('content', [])
                 total_pages = data.get('totalPages', 0)
                 
@@ -530,34 +965,44 @@ class Nepse:
                 
             return all_promoters
         except Exception as e:
-            print(f"Error fetching promoter list: {e}")
+            log.error("Error fetching promoter list: %s", e)
             return all_promoters
 
     # --- News & Corporate Actions ---
 
     def get_news_alerts(self, use_cache: bool = True):
         """Get general market news and alerts"""
-        url = f"{self.BASE_URL}/api/nots/news/media/news-and-alerts"
-        return self._cached_get("news_alerts", url, ttl=300) if use_cache else self.session.get(url, headers=self._get_auth_headers()).json()
+        url = self._URLS["news_alerts"]
+        return self._cached_get("news_alerts", url, ttl=300) if use_cache else self._parse(self.session.get(url, headers=self._get_auth_headers()))
 
     def get_company_news(self, symbol: str, use_cache: bool = True):
         """Get news for a specific company"""
-        self._ensure_security_ids()
+        cache_key = f"news_{symbol.upper()}"
+        if use_cache and self.cache:
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                return cached
+        
+        self._ensure_security_ids(symbol.upper())
         company_id = self.security_id_map.get(symbol.upper())
-        if not company_id: return []
+        if not company_id:
+            # Unknown symbol: remember the miss for as long as the security list is cached
+            if self.cache:
+                self.cache.set(cache_key, [], ttl=3600)
+            return []
         
         # Correct endpoint for specific company news
         url = f"{self.BASE_URL}/api/nots/application/company-news/{company_id}"
         
         # Cache key specific to company
         if use_cache and self.cache:
-            return self._cached_get(f"news_{symbol.upper()}", url, ttl=300)
+            return self._cached_get(cache_key, url, ttl=300)
             
         try:
             response = self.session.get(url, headers=self._get_auth_headers())
-            return response.json()
+            return self._parse(response)
         except Exception as e:
-            print(f"Error fetching news for {symbol}: {e}")
+            log.error("Error fetching news for %s: %s", symbol, e)
             return []
 
     def get_holiday_list(self, year: int = 2025, use_cache: bool = True):
@@ -580,35 +1025,35 @@ class Nepse:
         try:
             response = self.session.get(url, headers=self._get_auth_headers())
             response.raise_for_status()
-            return response.json()
+            return self._parse(response)
         except Exception as e:
-            print(f"Error fetching holiday list for {year}: {e}")
+            log.error("Error fetching holiday list for %s: %s", year, e)
             return []
 
     def get_sector_list(self, use_cache: bool = True):
         """Get complete list of all market sectors"""
-        url = f"{self.BASE_URL}/api/nots/sector"
+        url = self._URLS["sectors"]
         if use_cache and self.cache:
             return self._cached_get("sector_list", url, ttl=86400)
         try:
             response = self.session.get(url, headers=self._get_auth_headers())
             response.raise_for_status()
-            return response.json()
+            return self._parse(response)
         except Exception as e:
-            print(f"Error: {e}")
+            log.error("Error: %s", e)
             return []
 
     def get_all_indices(self, use_cache: bool = True):
         """Get all market indices in one call"""
-        url = f"{self.BASE_URL}/api/nots/index"
+        url = self._URLS["indices"]
         if use_cache and self.cache:
             return self._cached_get("all_indices", url, ttl=30)
         try:
             response = self.session.get(url, headers=self._get_auth_headers())
             response.raise_for_status()
-            return response.json()
+            return self._parse(response)
         except Exception as e:
-            print(f"Error: {e}")
+            log.error("Error: %s", e)
             return []
 
     def get_security_details(self, security_id: int, use_cache: bool = True):
@@ -622,12 +1067,12 @@ class Nepse:
             # Changed from POST to GET based on audit
             response = self.session.get(url, headers=self._get_auth_headers())
             response.raise_for_status()
-            data = response.json()
+            data = self._parse(response)
             if self.cache and use_cache:
                 self.cache.set(cache_key, data, ttl=3600)
             return data
         except Exception as e:
-            print(f"Error fetching security details for {security_id}: {e}")
+            log.error("Error fetching security details for %s: %s", security_id, e)
             return {}
 
     def get_historical_chart(self, security_id: int, start_date: str = None, end_date: str = None, use_cache: bool = True):
@@ -663,45 +1108,44 @@ class Nepse:
             # Add timeout to prevent hanging (company charts can be slow/timeout)
             response = self.session.get(url, headers=self._get_auth_headers(), timeout=30)
             response.raise_for_status()
-            data = response.json()
+            data = self._parse(response)
             
             # Local filtering for company charts if dates provided
             if security_id != 58 and start_date and end_date and data:
-                from datetime import datetime
-                start_ts = int(datetime.strptime(start_date, "%Y-%m-%d").timestamp() * 1000)
-                end_ts = int(datetime.strptime(end_date, "%Y-%m-%d").timestamp() * 1000)
+                start_ts = int(_parse_ymd(start_date).timestamp() * 1000)
+                end_ts = int(_parse_ymd(end_date).timestamp() * 1000)
                 # Assuming data has 't' field for timestamp
-                data = [d for d in data if 't' in d and start_ts <= d['t'] <= end_ts]
+                data = _filter_bars(data, start_ts, end_ts)
             
             if self.cache and use_cache:
                 self.cache.set(cache_key, data, ttl=1800)
             return data
         except Exception as e:
-            print(f"Error fetching chart for {security_id}: {e}")
+            log.error("Error fetching chart for %s: %s", security_id, e)
             return []
 
     def get_press_releases(self, use_cache: bool = True):
         """Get official NEPSE press releases"""
-        url = f"{self.BASE_URL}/api/nots/news/press-release"
+        url = self._URLS["press_releases"]
         if use_cache and self.cache:
             return self._cached_get("press_releases", url, ttl=3600)
         try:
             response = self.session.get(url, headers=self._get_auth_headers())
             response.raise_for_status()
-            return response.json()
+            return self._parse(response)
         except Exception as e:
-            print(f"Error: {e}")
+            log.error("Error: %s", e)
             return []
 
     def refresh_auth_token(self):
         """Manually refresh authentication token"""
-        url = f"{self.BASE_URL}/api/authenticate/refresh-token"
+        url = self._URLS["refresh_token"]
         try:
             # Fix: Send refresh token in the body
             payload = {"refreshToken": self.refresh_token} if self.refresh_token else {}
             response = self.session.post(url, headers=self._get_auth_headers(), json=payload)
             response.raise_for_status()
-            token_data = response.json()
+            token_data = self._parse(response)
             if token_data and 'accessToken' in token_data:
                 self.access_token = token_data['accessToken']
                 if 'serverTime' in token_data:
@@ -710,27 +1154,27 @@ class Nepse:
                     self.salts = token_data['salt']
             return token_data
         except Exception as e:
-            print(f"Error refreshing token: {e}")
+            log.error("Error refreshing token: %s", e)
             return {}
 
 
     def get_dividends(self, symbol: str):
         """Get dividend history for a specific company"""
-        self._ensure_security_ids()
+        self._ensure_security_ids(symbol.upper())
         company_id = self.security_id_map.get(symbol.upper())
         if not company_id: return []
         url = f"{self.BASE_URL}/api/nots/application/dividend/{company_id}"
         response = self.session.get(url, headers=self._get_auth_headers())
-        return response.json()
+        return self._parse(response)
 
     def get_agm(self, symbol: str):
         """Get AGM information for a specific company"""
-        self._ensure_security_ids()
+        self._ensure_security_ids(symbol.upper())
         company_id = self.security_id_map.get(symbol.upper())
         if not company_id: return []
         url = f"{self.BASE_URL}/api/nots/application/agm/{company_id}"
         response = self.session.get(url, headers=self._get_auth_headers())
-        return response.json()
+        return self._parse(response)
 
     def get_market_depth(self, symbol: str):
         """
@@ -740,20 +1184,20 @@ class Nepse:
         try:
             # 1. Get Company ID
             symbol = symbol.upper()
-            self._ensure_security_ids()
+            self._ensure_security_ids(symbol)
             company_id = self.security_id_map.get(symbol)
             
             if not company_id:
-                print(f"Symbol {symbol} not found in security map.")
+                log.warning("Symbol %s not found in security map.", symbol)
                 return {}
 
             # 2. Fetch Depth
             url = f"{self.BASE_URL}/api/nots/nepse-data/marketdepth/{company_id}"
             response = self.session.get(url, headers=self._get_auth_headers())
             response.raise_for_status()
-            return response.json()
+            return self._parse(response)
         except Exception as e:
-            print(f"Error fetching market depth for {symbol}: {e}")
+            log.error("Error fetching market depth for %s: %s", symbol, e)
             return {}
 
     def get_floorsheet(self, symbol: str = None, date: str = None, size: int = 500, limit: int = None, page: int = 0):
@@ -776,192 +1220,156 @@ class Nepse:
         """
         try:
             # Common setup
-            url = f"{self.BASE_URL}/api/nots/nepse-data/floorsheet"
-            headers = self._get_auth_headers()
-            headers.update({
+            headers = {
+                **self._get_auth_headers(),
                 "Host": "www.nepalstock.com.np",
                 "Origin": "https://www.nepalstock.com.np",
                 "Referer": "https://www.nepalstock.com.np/",
-            })
+            }
             
             # --- Scenario 1: Specific Stock (Fetch ALL or limit) ---
             if symbol:
                 symbol = symbol.upper()
-                self._ensure_security_ids()
+                self._ensure_security_ids(symbol)
                 company_id = self.security_id_map.get(symbol)
                 
                 if not company_id:
-                    print(f"Stock ID not found for {symbol}")
+                    log.warning("Stock ID not found for %s", symbol)
                     return []
                 
-                payload_id = self._get_floorsheet_payload_id(company_id, datetime.now())
-                payload = {"id": payload_id}
-                
-                all_records = []
-                current_top_page = page
-                pages_fetched = 0
+                payload_id = self._get_floorsheet_payload_id(company_id, _today())
+                params = {"size": size, "stockId": company_id, "sort": "contractId,desc"}
                 
                 # Default limit 0 means ALL for symbol
                 # If limit is None (not passed), we treat it as 0 (ALL) for symbol
                 effective_limit = limit if limit is not None else 0
-                
-                while True:
-                    # Construct URL for current page
-                    params = f"size={size}&stockId={company_id}&sort=contractId,desc&page={current_top_page}"
-                    if date:
-                        params += f"&businessDate={date}"
-                    
-                    full_url = f"{url}?{params}"
-                    
-                    try:
-                        response = self.session.post(full_url, headers=headers, json=payload)
-                        response.raise_for_status()
-                        data = response.json()
-                        
-                        sheet_data = data.get('floorsheets', {})
-                        content = sheet_data.get('content', [])
-                        
-                        if not content:
-                            break
-                            
-                        all_records.extend(content)
-                        pages_fetched += 1
-                        
-                        # Check checks
-                        total_pages = sheet_data.get('totalPages', 1)
-                        if current_top_page >= total_pages - 1:
-                            break
-                        
-                        # Stop if we reached the requested limit (and limit > 0)
-                        if effective_limit > 0 and pages_fetched >= effective_limit:
-                            break
-                            
-                        current_top_page += 1
-                        time.sleep(0.1) # Be nice to the server
-                        
-                    except Exception as e:
-                        print(f"Error fetching page {current_top_page} for {symbol}: {e}")
-                        break
-                        
-                return all_records
+                workers, bucket = 8, self._floorsheet_bucket
 
             # --- Scenario 2: General Market (Fetch 1 or limit) ---
             else:
-                # Use standard endpoint structure for general market
-                
                 # Payload ID: Generic
-                payload_id = self._get_floorsheet_payload_id(0, datetime.now())
-                payload = {"id": payload_id}
-                
-                all_records = []
-                current_top_page = page
-                pages_fetched = 0
+                payload_id = self._get_floorsheet_payload_id(0, _today())
+                params = {"size": size, "sort": "contractId,desc"}
                 
                 # Default limit for general market is 1 if not specified
-                effective_limit = limit if limit is not None else 1
-                
                 # If limit is 0 (fetch all for general market), allow it but it's loop-heavy
-                
-                while True:
-                    params = f"size={size}&sort=contractId,desc&page={current_top_page}"
-                    if date:
-                        params += f"&businessDate={date}"
-                    
-                    full_url = f"{url}?{params}"
-                    
-                    try:
-                        response = self.session.post(full_url, headers=headers, json=payload)
-                        response.raise_for_status()
-                        
-                        data = response.json()
-                        sheet_data = data.get('floorsheets', {})
-                        content = sheet_data.get('content', [])
-                        
-                        if not content:
-                            break
-                            
-                        all_records.extend(content)
-                        pages_fetched += 1
-                        
-                        total_pages = sheet_data.get('totalPages', 1)
-                        if current_top_page >= total_pages - 1:
-                            break
-                            
-                        if effective_limit > 0 and pages_fetched >= effective_limit:
-                            break
-                            
-                        current_top_page += 1
-                        time.sleep(0.5) # Generic market needs slower pacing
-                        
-                    except Exception as e:
-                        print(f"Error fetching page {current_top_page}: {e}")
-                        break
-                        
-                return all_records
+                effective_limit = limit if limit is not None else 1
+                # Generic market needs gentler pacing
+                workers, bucket = 4, self._market_floorsheet_bucket
+            
+            if date:
+                params["businessDate"] = date
+            
+            return self._fetch_floorsheet_pages(
+                headers, {"id": payload_id}, params, page, effective_limit, workers, bucket
+            )
 
         except Exception as e:
-            print(f"Error fetching floorsheet: {e}")
+            log.error("Error fetching floorsheet: %s", e)
+            return []
+
+    def _post_floorsheet_page(self, headers: Dict[str, str], payload: Dict[str, int], params: Dict[str, Any],
+                              page_no: int, bucket: TokenBucket):
+        """POST one floorsheet page (paced by `bucket`) and return its 'floorsheets' block"""
+        bucket.acquire()
+        response = self.session.post(self._URLS["floorsheet"], headers=headers, json=payload,
+                                     params={**params, "page": page_no})
+        if response.status_code != 200:
+            log.error("Floorsheet page %s returned HTTP %s", page_no, response.status_code)
+            return {}
+        return self._parse(response).get('floorsheets', {})
+
+    def _fetch_floorsheet_pages(self, headers: Dict[str, str], payload: Dict[str, int], params: Dict[str, Any],
+                                page: int, effective_limit: int, workers: int, bucket: TokenBucket):
+        """
+        Fetch `page` to learn totalPages, then the remaining pages on a
+        thread pool of `workers`, rate limited by `bucket`. Pages are merged
+        in order, stopping at the first failed, empty or short one.
+        """
+        try:
+            first = self._post_floorsheet_page(headers, payload, params, page, bucket)
+        except self._request_errors as e:
+            log.error("Error fetching floorsheet page %s: %s", page, e)
             return []
+        
+        size = params["size"]
+        content = first.get('content', [])
+        if not content:
+            return []
+        last_page = _floorsheet_last_page(first, page, effective_limit, size)
+        if last_page <= page:
+            return content
+        
+        rest = range(page + 1, last_page + 1)
+        
+        def results(futures):
+            for page_no, future in zip(rest, futures):
+                try:
+                    yield page_no, future.result()
+                except self._request_errors as e:
+                    yield page_no, e
+        
+        with ThreadPoolExecutor(max_workers=min(workers, len(rest))) as pool:
+            futures = [pool.submit(self._post_floorsheet_page, headers, payload, params, p, bucket) for p in rest]
+            records = _merge_floorsheet_pages(content, results(futures), size, self._request_errors)
+            for future in futures:
+                future.cancel()  # no-op for finished pages
+        return records
 
-    def _ensure_security_ids(self):
+    def _ensure_security_ids(self, *symbols: str):
         """
         Load security IDs if not already loaded.
         Uses get_security_list() for comprehensive coverage of all tradable securities:
         - Active stocks (status 'A')
         - Suspended/newly-listed stocks (status 'S')
         - Dormant stocks (not traded for weeks)
+        
+        A map read from today's file is re-fetched once if it lacks one of
+        `symbols`.
         """
-        if hasattr(self, 'security_id_map') and self.security_id_map:
+        if not _security_ids_needed(self.security_id_map, self._security_map_from_disk, symbols):
             return
-            
-        print("Loading Security IDs map...")
-        try:
-            # Use security_list for comprehensive coverage (544 securities vs 258 from price_volume)
-            securities = self.get_security_list(use_cache=True)
-            self.security_id_map = {
-                s['symbol']: s['id'] for s in securities if 'symbol' in s and 'id' in s
-            }
-            print(f"Loaded {len(self.security_id_map)} securities (active + suspended)")
-        except Exception as e:
-            print(f"Error loading security IDs: {e}")
-            self.security_id_map = {}
+        
+        with self._security_ids_lock:
+            if not self.security_id_map:
+                # The map changes at most once a day; reuse today's copy from disk
+                self.security_id_map = _load_security_map()
+                self._security_map_from_disk = bool(self.security_id_map)
+            if not _security_ids_needed(self.security_id_map, self._security_map_from_disk, symbols):
+                return
+            refetch = self._security_map_from_disk
+            self._security_map_from_disk = False
+                
+            log.info("Loading Security IDs map...")
+            try:
+                # Use security_list for comprehensive coverage (544 securities vs 258 from price_volume)
+                # Skip the cached list when refetching, it may be as old as the file
+                securities = self.get_security_list(use_cache=not refetch)
+                security_map = {
+                    s['symbol']: s['id'] for s in securities if 'symbol' in s and 'id' in s
+                }
+                log.info("Loaded %s securities (active + suspended)", len(security_map))
+                if security_map:
+                    self.security_id_map = security_map
+                    _save_security_map(security_map)
+            except Exception as e:
+                # Keeps the persisted map, if any
+                log.error("Error loading security IDs: %s", e)
             
             
-    def _get_floorsheet_payload_id(self, company_id: int, date_obj: datetime):
+    def _get_floorsheet_payload_id(self, company_id: int, date_obj: date):
         """
         Generate strict payload ID for floorsheet using NEPSE's specific salt logic.
+        The id depends on the market id, the day and the salts - not on company_id.
         """
         # 1. Get Base Market ID (Dummy ID)
-        status = self.get_market_status()
-        dummy_id = int(status.get('id', 147))
-        
-        # 2. Get Day
-        day = date_obj.day
-        
-        # 3. DUMMY_DATA (Embedded)
-        DUMMY_DATA = [
-            147, 117, 239, 143, 157, 312, 161, 612, 512, 804, 411, 527, 170, 511, 421, 667, 764, 621, 301, 106,
-            133, 793, 411, 511, 312, 423, 344, 346, 653, 758, 342, 222, 236, 811, 711, 611, 122, 447, 128, 199,
-            183, 135, 489, 703, 800, 745, 152, 863, 134, 211, 142, 564, 375, 793, 212, 153, 138, 153, 648, 611,
-            151, 649, 318, 143, 117, 756, 119, 141, 717, 113, 112, 146, 162, 660, 693, 261, 362, 354, 251, 641,
-            157, 178, 631, 192, 734, 445, 192, 883, 187, 122, 591, 731, 852, 384, 565, 596, 451, 772, 624, 691
-        ]
-        
-        try:
-            val = DUMMY_DATA[dummy_id % len(DUMMY_DATA)]
-        except:
-            val = 147
-            
-        e = val + dummy_id + 2 * day
-        
-        # 4. Salt Logic
-        salt_index = 1 if e % 10 < 4 else 3
+        dummy_id = self._market_id()
         
         # Ensure we have salts
         if not self.salts:
             self.authenticate()
             
-        return int(e + self.salts[salt_index] * day - self.salts[salt_index - 1])
+        return _payload_id(dummy_id, date_obj.day, tuple(self.salts))
 
     def clear_cache(self):
         """Manually clear all cached data"""
@@ -975,117 +1383,221 @@ class AsyncNepse:
     """
     
     BASE_URL = "https://www.nepalstock.com.np"
+    _URLS = _urls(BASE_URL)
     
-    def __init__(self, cache_ttl: int = 30):
-        self.token_parser = NepseTokenParser()
-        self.cache = CacheManager(cache_ttl)
+    def __init__(self, cache_ttl: int = 30, enable_cache: bool = True):
+        self.token_parser = NepseTokenParser.get()
+        self.cache = CacheManager(cache_ttl) if enable_cache else None
         self.access_token = None
         self.salts = None
+        self.security_id_map = {}
+        self._security_map_from_disk = False
+        # In-process memo for internal lookups, kept even when caching is disabled
+        self._memo = CacheManager(60)
+        # url -> (etag, last_modified, body) for conditional GETs
+        self._etag_cache = {}
+        # Floorsheet page pacing, shared by every concurrent floorsheet call
+        self._floorsheet_bucket = TokenBucket(rate=5.0, capacity=10)
+        self._market_floorsheet_bucket = TokenBucket(rate=1.5, capacity=3)
+        
+        # Created lazily inside the running event loop (again for a new loop)
+        self._session = None
+        self._session_loop = None
+        self._auth_lock = None
+        self._security_ids_lock = None
+        
+        # stream_market(): one poller fans out to every subscriber queue
+        self._subscribers = set()
+        self._poller = None
+        self._last_status = None
+    
+    def _bind_loop(self):
+        """
+        Drop the session and auth lock made in a previous event loop, e.g.
+        by an earlier asyncio.run(). Its connections cannot be closed from
+        the new loop, so the old session is just detached.
+        """
+        loop = asyncio.get_running_loop()
+        if self._session_loop is not loop:
+            if self._session is not None:
+                self._session.detach()
+                self._session = None
+            self._auth_lock = None
+            self._security_ids_lock = None
+            self._session_loop = loop
     
-    async def authenticate(self):
-        """Async authentication"""
-        url = f"{self.BASE_URL}/api/authenticate/prove"
-        async with aiohttp.ClientSession(connector=aiohttp.TCPConnector(ssl=False)) as session:
-            async with session.get(url) as response:
-                data = await response.json()
-                self.access_token, _, self.salts = \
-                    self.token_parser.parse_token_response(data)
+    def _get_session(self):
+        """Shared aiohttp session (one connection pool per instance and event loop)"""
+        self._bind_loop()
+        if self._session is None or self._session.closed:
+            # One host only: cap sockets to the floorsheet fan-out and cache DNS
+            connector = aiohttp.TCPConnector(
+                ssl=False, limit=32, limit_per_host=8, keepalive_timeout=30,
+                use_dns_cache=True, ttl_dns_cache=300,
+                enable_cleanup_closed=_NEEDS_CLEANUP_CLOSED,
+            )
+            self._session = aiohttp.ClientSession(connector=connector, json_serialize=_json.dumps)
+        return self._session
+    
+    async def close(self):
+        """Stop market streaming and close the shared HTTP session"""
+        if self._poller is not None:
+            self._poller.cancel()
+            self._poller = None
+        if self._session is not None and not self._session.closed:
+            if self._session_loop is asyncio.get_running_loop():
+                await self._session.close()
+            else:
+                self._session.detach()
+        self._session = None
+        self._session_loop = None
+    
+    async def __aenter__(self):
+        return self
+    
+    async def __aexit__(self, *exc_info):
+        await self.close()
+    
+    async def authenticate(self, force: bool = False):
+        """Async authentication (reuses a token another client just obtained unless `force`)"""
+        async with _async_token_lock():
+            entry = None if force else _shared_token(self.BASE_URL)
+            if entry is None:
+                url = self._URLS["prove"]
+                async with self._get_session().get(url) as response:
+                    data = _json.loads(await response.read())
+                tokens = self.token_parser.parse_token_response(data)
+                entry = _share_token(self.BASE_URL, tokens)
+        _, self.access_token, _, self.salts = entry
+    
+    async def _ensure_auth(self):
+        """Authenticate once, even when called from concurrent tasks"""
+        if self.access_token:
+            return
+        self._bind_loop()
+        if self._auth_lock is None:
+            self._auth_lock = asyncio.Lock()
+        async with self._auth_lock:
+            if not self.access_token:
+                await self.authenticate()
+    
+    async def _reauthenticate(self, stale_token: str):
+        """Replace a rejected token once, however many tasks saw it rejected"""
+        self._bind_loop()
+        if self._auth_lock is None:
+            self._auth_lock = asyncio.Lock()
+        async with self._auth_lock:
+            if self.access_token == stale_token:
+                await self.authenticate(force=True)
+    
+    async def _get_json(self, url: str, conditional: bool = False):
+        """
+        Authenticated GET over the shared session. With conditional=True the
+        request revalidates with If-None-Match/If-Modified-Since and a 304
+        returns the body kept from the last 200 response.
+        
+        An expired token (401/403) is renewed and the request retried once;
+        any other error status raises aiohttp.ClientResponseError.
+        """
+        await self._ensure_auth()
+        entry = self._etag_cache.get(url) if conditional else None
+        for retry in (False, True):
+            token = self.access_token
+            headers = {"Authorization": f"Salter {token}"}
+            if entry:
+                if entry[0]:
+                    headers["If-None-Match"] = entry[0]
+                if entry[1]:
+                    headers["If-Modified-Since"] = entry[1]
+            async with self._get_session().get(url, headers=headers) as response:
+                if retry or response.status not in (401, 403):
+                    if response.status == 304 and entry:
+                        return entry[2]
+                    response.raise_for_status()
+                    data = _json.loads(await response.read())
+                    if conditional:
+                        etag = response.headers.get("ETag")
+                        last_modified = response.headers.get("Last-Modified")
+                        if etag or last_modified:
+                            self._etag_cache[url] = (etag, last_modified, data)
+                    return data
+            await self._reauthenticate(token)
     
     async def get_market_status(self):
         """Async get market status"""
-        if not self.access_token: await self.authenticate()
-        url = f"{self.BASE_URL}/api/nots/nepse-data/market-open"
-        headers = {"Authorization": f"Salter {self.access_token}"}
-        async with aiohttp.ClientSession(connector=aiohttp.TCPConnector(ssl=False)) as session:
-            async with session.get(url, headers=headers) as response:
-                return await response.json()
+        return await self._get_json(self._URLS["market_status"])
+
+    async def _market_id(self):
+        """Market status id for payload ids, kept for 5 minutes per calendar day"""
+        key = f"market_id_{_today()}"
+        market_id = self._memo.get(key)
+        if market_id is None:
+            status = await self.get_market_status()
+            market_id = int(status.get('id', 147))
+            self._memo.set(key, market_id, ttl=300)
+        return market_id
 
     async def get_market_summary(self):
         """Async get market summary"""
-        if not self.access_token: await self.authenticate()
-        url = f"{self.BASE_URL}/api/nots/market-summary/"
-        headers = {"Authorization": f"Salter {self.access_token}"}
-        async with aiohttp.ClientSession(connector=aiohttp.TCPConnector(ssl=False)) as session:
-            async with session.get(url, headers=headers) as response:
-                return await response.json()
+        return await self._get_json(self._URLS["market_summary"], conditional=True)
 
     async def get_nepse_index(self):
         """Async get NEPSE index"""
-        if not self.access_token: await self.authenticate()
-        url = f"{self.BASE_URL}/api/nots/nepse-index"
-        headers = {"Authorization": f"Salter {self.access_token}"}
-        async with aiohttp.ClientSession(connector=aiohttp.TCPConnector(ssl=False)) as session:
-            async with session.get(url, headers=headers) as response:
-                return await response.json()
+        return await self._get_json(self._URLS["nepse_index"])
 
     async def get_sub_indices(self):
         """Async get sub-indices"""
-        if not self.access_token: await self.authenticate()
-        url = f"{self.BASE_URL}/api/nots"
-        headers = {"Authorization": f"Salter {self.access_token}"}
-        async with aiohttp.ClientSession(connector=aiohttp.TCPConnector(ssl=False)) as session:
-            async with session.get(url, headers=headers) as response:
-                return await response.json()
+        return await self._get_json(self._URLS["sub_indices"], conditional=True)
 
     async def get_promoter_list(self):
         """Async get list of all promoter securities"""
-        if not self.access_token: await self.authenticate()
-        
         cache_key = "promoter_list"
-        cached = self.cache.get(cache_key)
-        if cached is not None:
-            return cached
+        if self.cache:
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                return cached
             
-        endpoint = f"{self.BASE_URL}/api/nots/security/promoters"
-        headers = {"Authorization": f"Salter {self.access_token}"}
+        endpoint = self._URLS["promoters"]
         all_promoters = []
         current_page = 0
         
-        async with aiohttp.ClientSession(connector=aiohttp.TCPConnector(ssl=False)) as session:
-            try:
-                while True:
-                    url = f"{endpoint}?size=500&page={current_page}"
-                    async with session.get(url, headers=headers) as response:
-                        data = await response.json()
-                        
-                        content = data.get('content', [])
-                        total_pages = data.get('totalPages', 0)
-                        
-                        if not content:
-                            break
-                            
-                        all_promoters.extend(content)
-                        
-                        if current_page >= total_pages - 1:
-                            break
-                            
-                        current_page += 1
-                        
+        try:
+            while True:
+                data = await self._get_json(f"{endpoint}?size=500&page={current_page}")
+                
+                content = data.get('content', [])
+                total_pages = data.get('totalPages', 0)
+                
+                if not content:
+                    break
+                    
+                all_promoters.extend(content)
+                
+                if current_page >= total_pages - 1:
+                    break
+                    
+                current_page += 1
+                
+            if self.cache:
                 self.cache.set(cache_key, all_promoters, ttl=3600)
-                return all_promoters
-            except Exception as e:
-                print(f"Error fetching promoter list async: {e}")
-                return all_promoters
+            return all_promoters
+        except Exception as e:
+            log.error("Error fetching promoter list async: %s", e)
+            return all_promoters
 
     async def get_today_price(self, size: int = 500):
         """Async get today's price (OHLCV)"""
-        if not self.access_token: await self.authenticate()
+        await self._ensure_auth()
         url = f"{self.BASE_URL}/api/nots/nepse-data/today-price?size={size}"
         headers = {"Authorization": f"Salter {self.access_token}", "Content-Type": "application/json"}
         # For today-price, we need a POST request with payload
         payload = {"id": 1} # Dummy ID often works for simple today-price
-        async with aiohttp.ClientSession(connector=aiohttp.TCPConnector(ssl=False)) as session:
-            async with session.post(url, headers=headers, json=payload) as response:
-                return await response.json()
+        async with self._get_session().post(url, headers=headers, json=payload) as response:
+            return _json.loads(await response.read())
 
     async def get_live_market(self):
         """Async get live market snapshot"""
-        if not self.access_token: await self.authenticate()
-        url = f"{self.BASE_URL}/api/nots/lives-market"
-        headers = {"Authorization": f"Salter {self.access_token}"}
-        async with aiohttp.ClientSession(connector=aiohttp.TCPConnector(ssl=False)) as session:
-            async with session.get(url, headers=headers) as response:
-                return await response.json()
+        return await self._get_json(self._URLS["live_market"])
 
     async def get_stock_info(self, symbol: str, date: str = None):
         """Async get stock info (Live or Historical)"""
@@ -1110,14 +1622,319 @@ class AsyncNepse:
                 return stock
         return None
 
-    async def get_top_gainers(self):
+    async def get_top_gainers(self, limit: Optional[int] = None):
         """Async get top gainers"""
-        if not self.access_token: await self.authenticate()
-        url = f"{self.BASE_URL}/api/nots/top-ten/top-gainer"
-        headers = {"Authorization": f"Salter {self.access_token}"}
-        async with aiohttp.ClientSession(connector=aiohttp.TCPConnector(ssl=False)) as session:
-            async with session.get(url, headers=headers) as response:
-                return await response.json()
+        data = await self._get_json(self._URLS["top_gainers"])
+        return data[:limit] if limit else data
+
+    async def get_top_losers(self, limit: Optional[int] = None):
+        """Async get top losers"""
+        data = await self._get_json(self._URLS["top_losers"])
+        return data[:limit] if limit else data
+
+    async def get_top_turnover(self):
+        """Async get top 10 stocks by turnover"""
+        return await self._get_json(self._URLS["top_turnover"])
+
+    async def get_top_trade(self):
+        """Async get top 10 stocks by number of trades"""
+        return await self._get_json(self._URLS["top_trade"])
+
+    async def get_top_transaction(self):
+        """Async get top 10 stocks by number of transactions"""
+        return await self._get_json(self._URLS["top_transaction"])
+
+    async def get_all_indices(self):
+        """Async get all market indices"""
+        return await self._get_json(self._URLS["indices"])
+
+    async def get_all_top_tens(self):
+        """
+        Get every top-ten list concurrently
+        
+        Returns:
+            Dict with 'gainers', 'losers', 'turnover', 'trade' and 'transaction'
+        """
+        keys = ('gainers', 'losers', 'turnover', 'trade', 'transaction')
+        results = await asyncio.gather(
+            self.get_top_gainers(),
+            self.get_top_losers(),
+            self.get_top_turnover(),
+            self.get_top_trade(),
+            self.get_top_transaction(),
+        )
+        return dict(zip(keys, results))
+
+    async def get_snapshot(self, limit: int = 5):
+        """
+        Get a market snapshot in one call
+        
+        NEPSE has no composite endpoint, so the four requests are issued
+        concurrently over the shared session (one auth, one connection pool).
+        
+        Returns:
+            Dict with 'status', 'index', 'gainers' and 'losers'
+        """
+        status, index, gainers, losers = await asyncio.gather(
+            self.get_market_status(),
+            self.get_nepse_index(),
+            self.get_top_gainers(limit=limit),
+            self.get_top_losers(limit=limit),
+        )
+        return {'status': status, 'index': index, 'gainers': gainers, 'losers': losers}
+
+    async def get_security_list(self):
+        """Async get list of all securities (non-delisted)"""
+        if self.cache:
+            cached = self.cache.get("security_list")
+            if cached is not None:
+                return cached
+        data = await self._get_json(self._URLS["security_list"], conditional=True)
+        if self.cache:
+            self.cache.set("security_list", data, ttl=3600)
+        return data
+
+    async def _ensure_security_ids(self, *symbols: str):
+        """
+        Load the symbol -> security id map if not already loaded, once even
+        for concurrent tasks. A map read from today's file is re-fetched
+        once if it lacks one of `symbols`.
+        """
+        if not _security_ids_needed(self.security_id_map, self._security_map_from_disk, symbols):
+            return
+        self._bind_loop()
+        if self._security_ids_lock is None:
+            self._security_ids_lock = asyncio.Lock()
+        async with self._security_ids_lock:
+            if not self.security_id_map:
+                self.security_id_map = _load_security_map()
+                self._security_map_from_disk = bool(self.security_id_map)
+            if not _security_ids_needed(self.security_id_map, self._security_map_from_disk, symbols):
+                return
+            if self._security_map_from_disk:
+                # Skip the cached list, it may be as old as the file
+                self._security_map_from_disk = False
+                securities = await self._get_json(self._URLS["security_list"], conditional=True)
+            else:
+                securities = await self.get_security_list()
+            security_map = {
+                s['symbol']: s['id'] for s in securities if 'symbol' in s and 'id' in s
+            }
+            if security_map:
+                self.security_id_map = security_map
+                _save_security_map(security_map)
+
+    async def _get_many(self, path: str, symbols: List[str]) -> Dict[str, Any]:
+        """GET {path}/{company_id} for every symbol concurrently (unknown symbols give [])"""
+        symbols = [s.upper() for s in symbols]
+        await self._ensure_auth()
+        await self._ensure_security_ids(*symbols)
+        
+        async def fetch(symbol):
+            company_id = self.security_id_map.get(symbol)
+            if not company_id:
+                return []
+            try:
+                return await self._get_json(f"{self.BASE_URL}{path}/{company_id}")
+            except Exception as e:
+                log.error("Error fetching %s for %s: %s", path, symbol, e)
+                return []
+        
+        results = await asyncio.gather(*(fetch(s) for s in symbols))
+        return dict(zip(symbols, results))
+
+    async def get_dividends_many(self, symbols: List[str]) -> Dict[str, Any]:
+        """
+        Get dividend history for several companies concurrently
+        
+        Returns:
+            Dict mapping each (upper-cased) symbol to its dividend history
+        """
+        return await self._get_many("/api/nots/application/dividend", symbols)
+
+    async def get_agm_many(self, symbols: List[str]) -> Dict[str, Any]:
+        """
+        Get AGM information for several companies concurrently
+        
+        Returns:
+            Dict mapping each (upper-cased) symbol to its AGM information
+        """
+        return await self._get_many("/api/nots/application/agm", symbols)
+
+    async def get_company_news_many(self, symbols: List[str]) -> Dict[str, Any]:
+        """
+        Get news for several companies concurrently
+        
+        Returns:
+            Dict mapping each (upper-cased) symbol to its news list
+        """
+        return await self._get_many("/api/nots/application/company-news", symbols)
+
+    async def _floorsheet_page(self, params: Dict[str, Any], market_id: int, headers: Dict[str, str]):
+        """
+        POST one floorsheet page and return its 'floorsheets' block
+        
+        The token and the payload id (which depends on the salts) are taken
+        from the current authentication for every page; an expired token
+        (401/403) is renewed and the page retried once.
+        """
+        for retry in (False, True):
+            token = self.access_token
+            payload = {"id": _payload_id(market_id, _today().day, tuple(self.salts))}
+            async with self._get_session().post(
+                    self._URLS["floorsheet"], params=params, json=payload,
+                    headers={**headers, "Authorization": f"Salter {token}"}) as response:
+                if retry or response.status not in (401, 403):
+                    if response.status != 200:
+                        log.error("Floorsheet page %s returned HTTP %s", params.get("page"), response.status)
+                        return {}
+                    data = _json.loads(await response.read())
+                    return data.get('floorsheets', {})
+            await self._reauthenticate(token)
+
+    async def get_floorsheet(self, symbol: str = None, date: str = None, size: int = 500,
+                             limit: int = None, page: int = 0):
+        """
+        Async get floorsheet (transactions), fetching pages concurrently
+        
+        Page `page` is fetched first to learn the page count; the remaining
+        pages are then requested together, at most 8 at a time and paced by
+        the instance's token bucket. Arguments and defaults are the same as
+        Nepse.get_floorsheet.
+        
+        Returns:
+            List of transaction records from the LATEST trading session.
+        """
+        await self._ensure_auth()
+        params = {"size": size, "sort": "contractId,desc"}
+        
+        if symbol:
+            symbol = symbol.upper()
+            # The page-0 request needs both the stock id and the payload id;
+            # load the security map and the market status together
+            _, market_id = await asyncio.gather(self._ensure_security_ids(symbol), self._market_id())
+            company_id = self.security_id_map.get(symbol)
+            if not company_id:
+                log.warning("Stock ID not found for %s", symbol)
+                return []
+            params["stockId"] = company_id
+            # Default: all pages for a symbol, first page for the whole market
+            effective_limit = limit if limit is not None else 0
+            bucket = self._floorsheet_bucket
+        else:
+            effective_limit = limit if limit is not None else 1
+            bucket = self._market_floorsheet_bucket
+            market_id = await self._market_id()
+        if date:
+            params["businessDate"] = date
+        
+        # Authorization is added per page, from the then-current token
+        headers = {
+            "Content-Type": "application/json",
+            "Origin": self.BASE_URL,
+            "Referer": f"{self.BASE_URL}/",
+        }
+        semaphore = asyncio.Semaphore(8)
+        
+        async def fetch(page_no):
+            async with semaphore:
+                delay = bucket.reserve()
+                if delay:
+                    await asyncio.sleep(delay)
+                return await self._floorsheet_page({**params, "page": page_no}, market_id, headers)
+        
+        try:
+            first = await fetch(page)
+        except _ASYNC_REQUEST_ERRORS as e:
+            log.error("Error fetching floorsheet: %s", e)
+            return []
+        
+        content = first.get('content', [])
+        if not content:
+            return []
+        last_page = _floorsheet_last_page(first, page, effective_limit, size)
+        if last_page <= page:
+            return content
+        
+        rest = range(page + 1, last_page + 1)
+        sheets = await asyncio.gather(*(fetch(p) for p in rest), return_exceptions=True)
+        return _merge_floorsheet_pages(content, zip(rest, sheets), size, _ASYNC_REQUEST_ERRORS)
+
+    async def get_floorsheet_many(self, symbols: List[str], date: str = None, size: int = 500,
+                                  limit: int = None, concurrency: int = 4) -> Dict[str, List[Dict]]:
+        """
+        Get floorsheets for several symbols concurrently
+        
+        Up to `concurrency` symbols are fetched at once; all of their pages
+        draw from one token bucket, so the overall request rate stays the
+        same as for a single symbol.
+        
+        Args:
+            symbols: Stock symbols
+            date, size, limit: As for get_floorsheet (limit defaults to all pages)
+            concurrency: Maximum number of symbols fetched at once (default: 4)
+            
+        Returns:
+            Dict mapping each (upper-cased) symbol to its transaction records
+        """
+        # Resolve auth, ids and the market id once instead of per symbol
+        await self._ensure_auth()
+        await self._ensure_security_ids(*(s.upper() for s in symbols))
+        await self._market_id()
+        semaphore = asyncio.Semaphore(concurrency)
+        
+        async def one(symbol):
+            async with semaphore:
+                return await self.get_floorsheet(symbol, date=date, size=size, limit=limit)
+        
+        symbols = [s.upper() for s in symbols]
+        results = await asyncio.gather(*(one(s) for s in symbols))
+        return dict(zip(symbols, results))
+
+    async def stream_market(self, interval: float = 5.0):
+        """
+        Yield the market status each time it changes
+        
+        NEPSE has no push endpoint, so a single background task polls the
+        status every `interval` seconds and pushes changes to an
+        asyncio.Queue per subscriber - any number of concurrent
+        `async for` loops on one instance share the same poll. Slow
+        consumers skip straight to the latest status.
+        
+        Usage:
+            async for status in nepse.stream_market():
+                print(status['isOpen'], status['asOf'])
+        """
+        queue = asyncio.Queue(maxsize=1)
+        if self._last_status is not None:
+            queue.put_nowait(self._last_status)
+        self._subscribers.add(queue)
+        if self._poller is None or self._poller.done():
+            self._poller = asyncio.ensure_future(self._poll_market(interval))
+        try:
+            while True:
+                yield await queue.get()
+        finally:
+            self._subscribers.discard(queue)
+            if not self._subscribers and self._poller is not None:
+                self._poller.cancel()
+                self._poller = None
+    
+    async def _poll_market(self, interval: float):
+        """Producer for stream_market(): publish status changes to subscribers"""
+        while True:
+            try:
+                status = await self.get_market_status()
+            except Exception as e:
+                log.error("Error polling market status: %s", e)
+            else:
+                if status != self._last_status:
+                    self._last_status = status
+                    for queue in self._subscribers:
+                        if queue.full():
+                            queue.get_nowait()  # drop the stale status
+                        queue.put_nowait(status)
+            await asyncio.sleep(interval)
 
 # Convenience functions for quick usage
 
@@ -1,20 +1,135 @@
 
+import logging
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import pywasm
 import time
 import json
 import random
-from datetime import datetime, date
+import threading
+from datetime import datetime
+from functools import lru_cache, partial
 import pathlib
 
+try:
+    import wasmtime
+except ImportError:
+    wasmtime = None
+
+from . import _json
+
+log = logging.getLogger(__name__)
+
+# Index functions exported by css.wasm
+_WASM_EXPORTS = ("cdx", "rdx", "bdx", "ndx", "mdx")
+_WASM_PATH = pathlib.Path(__file__).parent / "assets" / "css.wasm"
+
+# css.wasm loaded once per backend and shared by every parser:
+# {uses_wasmtime: (runtime, instance, lock, exports)}
+_wasm = {}
+_wasm_lock = threading.Lock()
+
+
+def _pywasm_call(runtime, instance, name, *args):
+    """Call a WASM export through the pywasm runtime"""
+    return runtime.invocate(instance, name, list(args))[0]
+
+
+def _load_wasm(use_wasmtime: bool):
+    """(runtime, instance, lock, exports) for css.wasm, loaded on first use"""
+    loaded = _wasm.get(use_wasmtime)
+    if loaded is None:
+        with _wasm_lock:
+            loaded = _wasm.get(use_wasmtime)
+            if loaded is None:
+                if use_wasmtime:
+                    # Compiled (Cranelift) engine - much cheaper per call than pywasm
+                    engine = wasmtime.Engine()
+                    runtime = wasmtime.Store(engine)
+                    module = wasmtime.Module.from_file(engine, str(_WASM_PATH))
+                    instance = wasmtime.Instance(runtime, module, [])
+                    funcs = instance.exports(runtime)
+                    exports = {name: partial(funcs[name], runtime) for name in _WASM_EXPORTS}
+                else:
+                    # Pure-Python interpreter fallback
+                    runtime = pywasm.core.Runtime()
+                    instance = runtime.instance_from_file(str(_WASM_PATH))
+                    exports = {name: partial(_pywasm_call, runtime, instance, name) for name in _WASM_EXPORTS}
+                # WASM stores aren't thread-safe; every caller serializes on this lock
+                loaded = _wasm[use_wasmtime] = (runtime, instance, threading.Lock(), exports)
+    return loaded
+
+
+def _get_wasm():
+    """css.wasm on the preferred available backend"""
+    return _load_wasm(wasmtime is not None)
+
+
+@lru_cache(maxsize=128)
+def _compute_indices(use_wasmtime: bool, salts: tuple):
+    """
+    Token indices for a 5-tuple of salts. They depend only on the salts,
+    so repeat salts skip the 10 WASM calls for every parser in the process.
+    """
+    _, _, lock, exports = _load_wasm(use_wasmtime)
+    with lock:
+        return _run_exports(exports, salts)
+
+
+def _run_exports(exports, salts):
+    """Call the index exports for both tokens"""
+    cdx, rdx, bdx, ndx, mdx = (exports[name] for name in _WASM_EXPORTS)
+    
+    # 1. Indices for Access Token
+    # The WASM module exports functions like cdx, rdx, bdx...
+    n = cdx(*salts)
+    l_index = rdx(salts[0], salts[1], salts[3], salts[2], salts[4])
+    o = bdx(salts[0], salts[1], salts[3], salts[2], salts[4])
+    p = ndx(salts[0], salts[1], salts[3], salts[2], salts[4])
+    q = mdx(salts[0], salts[1], salts[3], salts[2], salts[4])
+    
+    # 2. Indices for Refresh Token
+    # Note the specific salt permutation used here
+    a = cdx(salts[1], salts[0], salts[2], salts[4], salts[3])
+    b = rdx(salts[1], salts[0], salts[2], salts[3], salts[4])
+    c = bdx(salts[1], salts[0], salts[3], salts[2], salts[4])
+    d = ndx(salts[1], salts[0], salts[3], salts[2], salts[4])
+    e = mdx(salts[1], salts[0], salts[3], salts[2], salts[4])
+    
+    return n, l_index, o, p, q, a, b, c, d, e
+
+
+def _descramble(token: str, indices) -> str:
+    """Join the slices between the five indices, dropping the character at each"""
+    starts = (0,) + tuple(i + 1 for i in indices)
+    ends = tuple(indices) + (None,)
+    return "".join([token[start:end] for start, end in zip(starts, ends)])
+
+
 class NepseTokenParser:
     """Handles the WASM-based token decryption logic"""
     
+    __slots__ = ("runtime", "wasm_module", "_exports", "_compute_indices", "_lock")
+    
+    _shared = None
+    _shared_lock = threading.Lock()
+    
+    @classmethod
+    def get(cls):
+        """Process-wide parser, so css.wasm is compiled once per interpreter"""
+        if cls._shared is None:
+            with cls._shared_lock:
+                if cls._shared is None:
+                    cls._shared = cls()
+        return cls._shared
+    
     def __init__(self):
-        # Load the WASM file from our local assets folder
-        wasm_path = pathlib.Path(__file__).parent / "assets" / "css.wasm"
-        self.runtime = pywasm.core.Runtime()
-        self.wasm_module = self.runtime.instance_from_file(str(wasm_path))
+        # The WASM module is parsed/compiled once per process, not per parser
+        use_wasmtime = wasmtime is not None
+        self.runtime, self.wasm_module, self._lock, self._exports = _load_wasm(use_wasmtime)
+        # Memoized per salts and shared process-wide
+        self._compute_indices = partial(_compute_indices, use_wasmtime)
         
     def parse_token_response(self, response_data):
         """
@@ -32,46 +147,12 @@ class NepseTokenParser:
         except (KeyError, ValueError, TypeError) as e:
             raise ValueError(f"Invalid salt data in response: {e}")
 
-        # 2. Calculate indices for Access Token using WASM functions
-        # The WASM module exports functions like cdx, rdx, bdx...
-        n = self.runtime.invocate(self.wasm_module, "cdx", salts)[0]
-        l_index = self.runtime.invocate(self.wasm_module, "rdx", [salts[0], salts[1], salts[3], salts[2], salts[4]])[0]
-        o = self.runtime.invocate(self.wasm_module, "bdx", [salts[0], salts[1], salts[3], salts[2], salts[4]])[0]
-        p = self.runtime.invocate(self.wasm_module, "ndx", [salts[0], salts[1], salts[3], salts[2], salts[4]])[0]
-        q = self.runtime.invocate(self.wasm_module, "mdx", [salts[0], salts[1], salts[3], salts[2], salts[4]])[0]
-        
-        # 3. Calculate indices for Refresh Token
-        # Note the specific salt permutation used here
-        salts_reversed = [salts[1], salts[0], salts[2], salts[4], salts[3]]
-        a = self.runtime.invocate(self.wasm_module, "cdx", salts_reversed)[0]
-        b = self.runtime.invocate(self.wasm_module, "rdx", [salts[1], salts[0], salts[2], salts[3], salts[4]])[0]
-        c = self.runtime.invocate(self.wasm_module, "bdx", [salts[1], salts[0], salts[3], salts[2], salts[4]])[0]
-        d = self.runtime.invocate(self.wasm_module, "ndx", [salts[1], salts[0], salts[3], salts[2], salts[4]])[0]
-        e = self.runtime.invocate(self.wasm_module, "mdx", [salts[1], salts[0], salts[3], salts[2], salts[4]])[0]
-        
-        # 4. Extract raw tokens
-        access_token = response_data["accessToken"]
-        refresh_token = response_data["refreshToken"]
-        
-        # 5. Descramble Access Token
-        parsed_access_token = (
-            access_token[0:n]
-            + access_token[n + 1 : l_index]
-            + access_token[l_index + 1 : o]
-            + access_token[o + 1 : p]
-            + access_token[p + 1 : q]
-            + access_token[q + 1 :]
-        )
+        # 2. Calculate token indices using WASM functions (memoized per salts)
+        indices = self._compute_indices(tuple(salts))
         
-        # 6. Descramble Refresh Token
-        parsed_refresh_token = (
-            refresh_token[0:a]
-            + refresh_token[a + 1 : b]
-            + refresh_token[b + 1 : c]
-            + refresh_token[c + 1 : d]
-            + refresh_token[d + 1 : e]
-            + refresh_token[e + 1 :]
-        )
+        # 3. Descramble both tokens
+        parsed_access_token = _descramble(response_data["accessToken"], indices[:5])
+        parsed_refresh_token = _descramble(response_data["refreshToken"], indices[5:])
         
         return parsed_access_token, parsed_refresh_token, salts
 
@@ -82,7 +163,7 @@ class MyNepseSession:
     
     def __init__(self):
         self.session = requests.Session()
-        self.token_parser = NepseTokenParser()
+        self.token_parser = NepseTokenParser.get()
         
         # State
         self.access_token = None
@@ -96,8 +177,15 @@ class MyNepseSession:
             "User-Agent": "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/133.0.0.0 Safari/537.36",
             "Content-Type": "application/json",
             "Referer": self.BASE_URL,
-            "Origin": self.BASE_URL
+            "Origin": self.BASE_URL,
+            "Connection": "keep-alive"
         })
+        adapter = HTTPAdapter(
+            pool_connections=16,
+            pool_maxsize=32,
+            max_retries=Retry(total=3, backoff_factor=0.2, status_forcelist=[502, 503, 504], raise_on_status=False)
+        )
+        self.session.mount("https://", adapter)
         
         # Authenticate immediately
         self.authenticate()
@@ -105,30 +193,26 @@ class MyNepseSession:
     def authenticate(self):
         """Fetch and process the scramble token"""
         url = f"{self.BASE_URL}/api/authenticate/prove"
-        print(f"Authenticating with {url}...")
+        log.info("Authenticating with %s...", url)
         
-        # 1. Get the raw scrambled response
-        response = self.session.get(url)
+        # 1. Get the raw scrambled response (without any previous token)
+        response = self.session.get(url, headers={"Authorization": None})
         response.raise_for_status()
-        data = response.json()
+        data = _json.loads(response.content)
         
         # 2. Use our parser to decrypt it
         self.access_token, self.refresh_token, self.salts = \
             self.token_parser.parse_token_response(data)
+        # Every later request picks the token up from the session headers
+        self.session.headers["Authorization"] = f"Salter {self.access_token}"
             
         self.token_timestamp = int(time.time())
-        print("Authentication successful! Token descrambled.")
+        log.info("Authentication successful! Token descrambled.")
 
-    def _get_auth_headers(self):
-        """Construct the special headers required by NEPSE"""
+    def _ensure_auth(self):
+        """Authenticate if we don't hold a token yet"""
         if not self.access_token:
             self.authenticate()
-            
-        return {
-            "Authorization": f"Salter {self.access_token}",
-            "Content-Type": "application/json",
-            "User-Agent": self.session.headers["User-Agent"]
-        }
 
     def _get_dummy_id(self):
         """
@@ -145,9 +229,6 @@ class MyNepseSession:
         status = self.get_market_status()
         base_id = status['id']
         
-        # Standard dummy ID calculation logic
-        today_day = date.today().day
-        
         # Calculation for 'Scrips' (standard)
         # e = dummy_data[dummy_id] + dummy_id + 2 * date.today().day
         # But we need the 'dummy_data' array. 
@@ -161,18 +242,21 @@ class MyNepseSession:
     def get_market_status(self):
         """Get market open/close status"""
         url = f"{self.BASE_URL}/api/nots/nepse-data/market-open"
-        response = self.session.get(url, headers=self._get_auth_headers())
-        return response.json()
+        self._ensure_auth()
+        response = self.session.get(url)
+        return _json.loads(response.content)
 
     def get_market_summary(self):
         """Get market summary"""
         url = f"{self.BASE_URL}/api/nots/market-summary/"
-        response = self.session.get(url, headers=self._get_auth_headers())
-        return response.json()
+        self._ensure_auth()
+        response = self.session.get(url)
+        return _json.loads(response.content)
         
     def get_top_gainers(self):
         """Get top gainers"""
         url = f"{self.BASE_URL}/api/nots/top-ten/top-gainer"
-        response = self.session.get(url, headers=self._get_auth_headers())
-        return response.json()
+        self._ensure_auth()
+        response = self.session.get(url)
+        return _json.loads(response.content)
 
@@ -47,6 +47,15 @@ setup(
         "websockets>=10.0",
     ],
     extras_require={
+        "perf": [
+            "orjson>=3.9.0",
+            "pysimdjson>=5.0.0",
+            "wasmtime>=14.0.0",
+            "uvloop>=0.18.0; sys_platform != 'win32'",
+        ],
+        "http2": [
+            "httpx[http2]>=0.24.0",
+        ],
         "dev": [
             "pytest>=7.4.0",
             "black>=23.0.0",
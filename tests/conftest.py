@@ -20,3 +20,10 @@ def mock_market_status():
         "isOpen": "OPEN",
         "asOf": "2026-02-15T12:00:00"
     }
+
+@pytest.fixture(autouse=True)
+def security_map_dir(tmp_path, monkeypatch):
+    """Keep the persisted security map out of the user's home directory"""
+    from nepse_data_api import market
+    monkeypatch.setattr(market, "_SECURITY_MAP_DIR", tmp_path / "nepse")
+    return tmp_path / "nepse"
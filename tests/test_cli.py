@@ -0,0 +1,37 @@
+import pytest
+from argparse import Namespace
+from unittest.mock import MagicMock
+from nepse_data_api import cli
+
+class TestCli:
+    def test_format_rows(self):
+        """Rows are padded into columns with an optional sign"""
+        stocks = [
+            {"symbol": "NABIL", "ltp": 500, "percentageChange": 2.5},
+            {"symbol": "NICA", "ltp": 900.5, "percentageChange": 1},
+        ]
+        assert cli.format_rows(stocks, sign='+') == (
+            "NABIL        500        +2.5%\n"
+            "NICA         900.5      +1%\n"
+        )
+        assert cli.format_rows([]) == ""
+
+    def test_display_nepse_index_picks_nepse_entry(self):
+        """The 'NEPSE Index' entry is shown even when it isn't first"""
+        indices = [
+            {"index": "Sensitive Index", "currentValue": 400, "change": -1, "perChange": -0.2},
+            {"index": "NEPSE Index", "currentValue": 2700.5, "change": 12.3, "perChange": 0.45},
+        ]
+        out = cli.display_nepse_index(indices)
+        assert "NEPSE Index: 2700.5" in out
+        assert "\033[92m12.3 (0.45%)" in out
+
+    def test_handlers_cover_all_commands(self):
+        """Every command has a JSON and a pretty handler"""
+        assert set(cli.JSON_HANDLERS) == set(cli.PRETTY_HANDLERS)
+        
+        nepse = MagicMock()
+        nepse.get_top_losers.return_value = [{"symbol": "X", "ltp": 10, "percentageChange": -3}]
+        out = cli.PRETTY_HANDLERS['losers'](nepse, Namespace(limit=1))
+        nepse.get_top_losers.assert_called_once_with(limit=1)
+        assert "Top 1 Losers" in out and "X " in out
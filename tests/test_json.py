@@ -0,0 +1,38 @@
+import pytest
+from dataclasses import dataclass
+from datetime import datetime
+from nepse_data_api import _json
+
+class TestJson:
+    def test_dumps_pretty(self):
+        """Pretty output keeps non-ASCII text and stringifies int keys"""
+        out = _json.dumps({"name": "नेपाल", 1: [1, 2]}, pretty=True)
+        assert '"name": "नेपाल"' in out
+        assert '"1": [' in out
+        assert out.startswith("{\n  ")
+
+    def test_dumpb_datetime(self):
+        """datetimes serialize as ISO strings on every backend"""
+        data = _json.dumpb({"asOf": datetime(2026, 2, 15, 12, 0, 0)})
+        assert _json.loads(data) == {"asOf": "2026-02-15T12:00:00"}
+
+    def test_loads_head(self):
+        """Only the first `limit` rows are returned"""
+        raw = b'[{"symbol": "A"}, {"symbol": "B"}, {"symbol": "C"}]'
+        assert _json.loads_head(raw, 2) == [{"symbol": "A"}, {"symbol": "B"}]
+        assert _json.loads_head(raw, 10) == _json.loads(raw)
+        assert _json.loads_head(b'{"error": "x"}', 2) == {"error": "x"}
+
+    @pytest.mark.parametrize("use_orjson", [True, False])
+    def test_dumps_dataclass(self, use_orjson, monkeypatch):
+        """Dataclasses serialize as objects with and without orjson"""
+        @dataclass
+        class Price:
+            symbol: str
+            close: float
+        
+        if not use_orjson:
+            monkeypatch.setattr(_json, "orjson", None)
+        elif _json.orjson is None:
+            pytest.skip("orjson not installed")
+        assert _json.loads(_json.dumps({"p": Price("NABIL", 512.5)})) == {"p": {"symbol": "NABIL", "close": 512.5}}
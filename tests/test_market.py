@@ -1,6 +1,9 @@
+import asyncio
+import time
 import pytest
-from unittest.mock import MagicMock, patch
-from nepse_data_api.market import Nepse
+from unittest.mock import AsyncMock, MagicMock, patch
+from nepse_data_api import market
+from nepse_data_api.market import Nepse, AsyncNepse, CacheManager, TokenBucket, _filter_bars, _merge_floorsheet_pages
 
 class TestNepseMarket:
     
@@ -11,10 +14,7 @@ class TestNepseMarket:
         mock_instance = mock_session.return_value
         mock_response = MagicMock()
         mock_response.status_code = 200
-        mock_response.json.return_value = {
-            "isOpen": "OPEN",
-            "asOf": "2026-02-15T12:00:00"
-        }
+        mock_response.content = b'{"isOpen": "OPEN", "asOf": "2026-02-15T12:00:00"}'
         mock_instance.get.return_value = mock_response
 
         # Test
@@ -30,7 +30,7 @@ class TestNepseMarket:
     def test_caching(self, mock_session):
         """Test that caching works"""
         mock_instance = mock_session.return_value
-        mock_instance.get.return_value.json.return_value = {"data": "test"}
+        mock_instance.get.return_value.content = b'{"data": "test"}'
         mock_instance.get.return_value.status_code = 200
         
         with patch.object(Nepse, 'authenticate'):
@@ -44,3 +44,442 @@ class TestNepseMarket:
             # Second call - should hit cache
             nepse.get_market_summary()
             assert mock_instance.get.call_count == 1
+
+    def test_async_authenticates_once(self):
+        """Concurrent async calls share a single authentication"""
+        calls = []
+        
+        async def fake_authenticate(self):
+            calls.append(1)
+            await asyncio.sleep(0.01)
+            self.access_token = "dummy"
+        
+        async def run():
+            nepse = AsyncNepse(enable_cache=False)
+            with patch.object(AsyncNepse, 'authenticate', fake_authenticate):
+                await asyncio.gather(*(nepse._ensure_auth() for _ in range(4)))
+        
+        asyncio.run(run())
+        assert len(calls) == 1
+
+    def test_cache_manager_lru_and_ttl(self):
+        """Least recently used entries are evicted and expired ones dropped"""
+        cache = CacheManager(default_ttl=30, max_entries=2)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        assert cache.get("a") == 1  # "b" is now least recently used
+        cache.set("c", 3)
+        assert cache.get("b") is None
+        assert cache.get("a") == 1 and cache.get("c") == 3
+        
+        now = time.monotonic()
+        with patch('nepse_data_api.market.time.monotonic', return_value=now + 31):
+            assert cache.get("a") is None
+
+    @patch('nepse_data_api.market.requests.Session')
+    def test_daily_trade_404_is_cached(self, mock_session):
+        """A date with no trading is only requested once"""
+        mock_instance = mock_session.return_value
+        mock_instance.get.return_value.status_code = 404
+        
+        with patch.object(Nepse, 'authenticate'):
+            nepse = Nepse(enable_cache=True)
+            nepse.access_token = "dummy"
+            
+            assert nepse.get_daily_trade("2026-02-14") == []
+            assert nepse.get_daily_trade("2026-02-14") == []
+            assert mock_instance.get.call_count == 1
+
+    @pytest.mark.parametrize("use_numpy", [False, True])
+    def test_filter_bars(self, use_numpy, monkeypatch):
+        """Chart bars are kept only inside the timestamp range, with or without numpy"""
+        np = pytest.importorskip("numpy") if use_numpy else None
+        monkeypatch.setattr(market, "np", np)
+        bars = [{"t": 100, "c": 1}, {"t": 200, "c": 2}, {"c": 3}, {"t": 300, "c": 4}]
+        assert _filter_bars(bars, 150, 300) == [{"t": 200, "c": 2}, {"t": 300, "c": 4}]
+
+    @patch('nepse_data_api.market.requests.Session')
+    def test_auto_refresh_thread_stops_on_close(self, mock_session):
+        """The background token keeper runs until close()"""
+        with patch.object(Nepse, 'authenticate'):
+            nepse = Nepse(enable_cache=False, auto_refresh=True)
+            thread = nepse._refresh_thread
+            assert thread.is_alive()
+            
+            nepse.close()
+            assert not thread.is_alive()
+            mock_session.return_value.close.assert_called_once()
+
+    @patch('nepse_data_api.market.requests.Session')
+    def test_token_keeper_installs_descrambled_token(self, mock_session):
+        """One keeper tick replaces the auth headers with a freshly parsed token"""
+        mock_session.return_value.get.return_value.content = b'{"prove": 1}'
+        tokens = iter([("first", "refresh", [1, 2, 3, 4, 5]), ("fresh", "refresh", [5, 4, 3, 2, 1])])
+        
+        with patch('nepse_data_api.market._shared_token_cache', {}), \
+             patch('nepse_data_api.security.NepseTokenParser.parse_token_response',
+                   side_effect=lambda data: next(tokens)):
+            nepse = Nepse(enable_cache=False)
+            assert nepse._get_auth_headers()["Authorization"] == "Salter first"
+            
+            nepse._stop_refresh = MagicMock()
+            nepse._stop_refresh.wait.side_effect = [False, True]  # one tick, then stop
+            nepse._token_keeper()
+            assert nepse._get_auth_headers()["Authorization"] == "Salter fresh"
+            assert nepse.salts == [5, 4, 3, 2, 1]
+            mock_session.return_value.post.assert_not_called()
+
+    def test_stream_market_yields_changes(self):
+        """stream_market only yields when the status changes"""
+        statuses = iter([{"isOpen": "OPEN"}, {"isOpen": "OPEN"}, {"isOpen": "CLOSE"}])
+        
+        async def fake_status(self):
+            return next(statuses)
+        
+        async def run():
+            nepse = AsyncNepse(enable_cache=False)
+            seen = []
+            with patch.object(AsyncNepse, 'get_market_status', fake_status):
+                async for status in nepse.stream_market(interval=0):
+                    seen.append(status)
+                    if len(seen) == 2:
+                        break
+            await nepse.close()
+            return seen
+        
+        assert asyncio.run(run()) == [{"isOpen": "OPEN"}, {"isOpen": "CLOSE"}]
+
+    def test_stream_market_reauthenticates_on_401(self):
+        """An expired token is renewed; the 401 body is never published as a status"""
+        from aiohttp import web
+        from aiohttp.test_utils import TestServer
+        
+        state = {"token": "old", "polls": 0}
+        
+        async def market_open(request):
+            if request.headers["Authorization"] != f"Salter {state['token']}":
+                return web.json_response({"message": "Invalid token"}, status=401)
+            state["polls"] += 1
+            return web.json_response({"isOpen": "OPEN" if state["polls"] == 1 else "CLOSE"})
+        
+        async def fake_authenticate(self, force=False):
+            self.access_token = state["token"]
+        
+        async def run():
+            app = web.Application()
+            app.router.add_get("/market-open", market_open)
+            async with TestServer(app) as server:
+                async with AsyncNepse(enable_cache=False) as nepse:
+                    nepse._URLS = {**nepse._URLS, "market_status": str(server.make_url("/market-open"))}
+                    seen = []
+                    with patch.object(AsyncNepse, 'authenticate', fake_authenticate):
+                        async for status in nepse.stream_market(interval=0):
+                            seen.append(status)
+                            state["token"] = "new"  # the server expires the old token
+                            if len(seen) == 2:
+                                break
+                    return seen
+        
+        assert asyncio.run(run()) == [{"isOpen": "OPEN"}, {"isOpen": "CLOSE"}]
+
+    def test_get_dividends_many(self):
+        """Per-symbol requests go out concurrently after one security-map load"""
+        urls = []
+        
+        async def fake_get_json(self, url, conditional=False):
+            urls.append(url)
+            if url.endswith("nonDelisted=true"):
+                return [{"symbol": "NABIL", "id": 131}, {"symbol": "NICA", "id": 139}]
+            return [{"url": url}]
+        
+        async def run():
+            nepse = AsyncNepse(enable_cache=False)
+            nepse.access_token = "dummy"
+            with patch.object(AsyncNepse, '_get_json', fake_get_json):
+                return await nepse.get_dividends_many(["nabil", "NICA", "UNKNOWN"])
+        
+        result = asyncio.run(run())
+        assert result["NABIL"] == [{"url": "https://www.nepalstock.com.np/api/nots/application/dividend/131"}]
+        assert result["NICA"][0]["url"].endswith("/139")
+        assert result["UNKNOWN"] == []
+        assert len(urls) == 3
+
+    def test_async_floorsheet_fetches_all_pages(self):
+        """Remaining floorsheet pages are fetched and merged in page order"""
+        async def fake_page(self, params, market_id, headers):
+            await asyncio.sleep(0.01 * (3 - params["page"]))  # finish out of order
+            return {"content": [params["page"]], "totalPages": 3}
+        
+        async def fake_status(self):
+            return {"id": 150}
+        
+        async def run():
+            nepse = AsyncNepse(enable_cache=False)
+            nepse.access_token = "dummy"
+            nepse.salts = [1, 2, 3, 4, 5]
+            with patch.object(AsyncNepse, '_floorsheet_page', fake_page), \
+                 patch.object(AsyncNepse, 'get_market_status', fake_status):
+                return await nepse.get_floorsheet(size=1, limit=0)
+        
+        assert asyncio.run(run()) == [0, 1, 2]
+
+    def test_async_floorsheet_page_renews_expired_token(self):
+        """A 401 floorsheet page is retried with a new token and matching payload id"""
+        from aiohttp import web
+        from aiohttp.test_utils import TestServer
+        
+        payload_ids = []
+        
+        async def floorsheet(request):
+            payload_ids.append((await request.json())["id"])
+            if request.headers["Authorization"] != "Salter new":
+                return web.json_response({"message": "Invalid token"}, status=401)
+            return web.json_response({"floorsheets": {"content": [1], "totalPages": 1}})
+        
+        async def fake_authenticate(self, force=False):
+            self.access_token, self.salts = "new", [5, 4, 3, 2, 1]
+        
+        async def run():
+            app = web.Application()
+            app.router.add_post("/floorsheet", floorsheet)
+            async with TestServer(app) as server:
+                async with AsyncNepse(enable_cache=False) as nepse:
+                    nepse._URLS = {**nepse._URLS, "floorsheet": str(server.make_url("/floorsheet"))}
+                    nepse.access_token, nepse.salts = "old", [1, 2, 3, 4, 5]
+                    with patch.object(AsyncNepse, 'authenticate', fake_authenticate):
+                        return await nepse._floorsheet_page({"page": 0}, 150, {})
+        
+        assert asyncio.run(run()) == {"content": [1], "totalPages": 1}
+        assert payload_ids[-1] == market._payload_id(150, market._today().day, (5, 4, 3, 2, 1))
+
+    @patch('nepse_data_api.market.requests.Session')
+    def test_today_price_reuses_market_status(self, mock_session):
+        """get_today_price takes the business date from a status fetched just before"""
+        mock_instance = mock_session.return_value
+        mock_instance.get.return_value.status_code = 200
+        mock_instance.get.return_value.content = b'{"isOpen": "CLOSE", "asOf": "2026-02-12T15:00:00", "id": 150}'
+        mock_instance.post.return_value.status_code = 200
+        mock_instance.post.return_value.content = b'{"content": []}'
+        
+        with patch.object(Nepse, 'authenticate'):
+            nepse = Nepse(enable_cache=False)
+            nepse.access_token = "dummy"
+            nepse.salts = [1, 2, 3, 4, 5]
+            
+            nepse.get_market_status()
+            nepse.get_today_price()
+            assert mock_instance.get.call_count == 1
+            assert "businessDate=2026-02-12" in mock_instance.post.call_args[0][0]
+
+    @patch('nepse_data_api.market.requests.Session')
+    def test_floorsheet_fetches_pages_in_parallel(self, mock_session):
+        """Sync floorsheet merges every page in order"""
+        def fake_post(url, headers=None, json=None, params=None):
+            page = params["page"]
+            response = MagicMock()
+            response.status_code = 200
+            response.content = b'{"floorsheets": {"content": [%d], "totalPages": 4}}' % page
+            return response
+        
+        mock_session.return_value.post.side_effect = fake_post
+        with patch.object(Nepse, 'authenticate'), \
+             patch.object(Nepse, '_get_floorsheet_payload_id', return_value=1):
+            nepse = Nepse(enable_cache=False)
+            nepse.access_token = "dummy"
+            nepse._market_floorsheet_bucket = TokenBucket(rate=1000.0, capacity=10)
+            assert nepse.get_floorsheet(size=1, limit=0) == [0, 1, 2, 3]
+            assert nepse.get_floorsheet(size=1, limit=2, page=1) == [1, 2]
+            # A page shorter than `size` is the last one despite totalPages
+            mock_session.return_value.post.reset_mock()
+            assert nepse.get_floorsheet(size=2, limit=0) == [0]
+            assert mock_session.return_value.post.call_count == 1
+
+    def test_merge_floorsheet_pages_stops_at_first_gap(self):
+        """Pages are merged in order up to the first failed or short page"""
+        failed = [(1, {"content": [1, 1]}), (2, ValueError("bad page")), (3, {"content": [3, 3]})]
+        assert _merge_floorsheet_pages([0, 0], failed, 2, (ValueError,)) == [0, 0, 1, 1]
+        short = [(1, {"content": [1]}), (2, {"content": [2, 2]})]
+        assert _merge_floorsheet_pages([0, 0], short, 2, (ValueError,)) == [0, 0, 1]
+        with pytest.raises(KeyError):
+            _merge_floorsheet_pages([0, 0], [(1, KeyError("bug"))], 2, (ValueError,))
+
+    def test_async_context_manager_closes_session(self):
+        """`async with AsyncNepse()` closes the shared session on exit"""
+        async def run():
+            async with AsyncNepse(enable_cache=False) as nepse:
+                session = nepse._get_session()
+                assert nepse._get_session() is session
+            return session
+        
+        assert asyncio.run(run()).closed
+
+    def test_token_bucket_bursts_then_paces(self):
+        """A full bucket allows `capacity` calls at once, then spaces them by 1/rate"""
+        bucket = TokenBucket(rate=10.0, capacity=2)
+        assert bucket.reserve() == 0.0
+        assert bucket.reserve() == 0.0
+        assert 0.09 < bucket.reserve() <= 0.1
+        assert 0.19 < bucket.reserve() <= 0.2
+
+    @patch('nepse_data_api.market.requests.Session')
+    def test_token_shared_between_clients(self, mock_session):
+        """A second client reuses the token the first one just parsed"""
+        mock_session.return_value.get.return_value.content = b'{"prove": 1}'
+        parsed = ("access", "refresh", [1, 2, 3, 4, 5])
+        
+        with patch('nepse_data_api.market._shared_token_cache', {}), \
+             patch('nepse_data_api.security.NepseTokenParser.parse_token_response',
+                   return_value=parsed) as parse:
+            first = Nepse(enable_cache=False)
+            second = Nepse(enable_cache=False)
+            assert parse.call_count == 1
+            assert second.access_token == first.access_token == "access"
+            
+            second.authenticate(force=True)
+            assert parse.call_count == 2
+
+    @patch('nepse_data_api.market.requests.Session')
+    def test_reused_token_keeps_its_age(self, mock_session):
+        """A reused token is not treated as new, and the keeper renews it on time"""
+        now_mono, now_wall = time.monotonic(), time.time()
+        cache = {Nepse.BASE_URL: (now_mono - 5, now_wall - 5, "aged", "refresh", [1, 2, 3, 4, 5])}
+        
+        with patch('nepse_data_api.market._shared_token_cache', cache):
+            nepse = Nepse(enable_cache=False)
+            mock_session.return_value.get.assert_not_called()
+            assert nepse.access_token == "aged"
+            assert nepse.token_timestamp == int(now_wall - 5)
+            
+            nepse._stop_refresh = MagicMock()
+            nepse._stop_refresh.wait.return_value = True
+            nepse._token_keeper()
+            assert 29 <= nepse._stop_refresh.wait.call_args[0][0] <= 31
+            
+            # Older tokens are not handed out any more
+            mock_session.return_value.get.return_value.content = b'{"prove": 1}'
+            cache[Nepse.BASE_URL] = (now_mono - 20, now_wall - 20, "stale", "refresh", [1, 2, 3, 4, 5])
+            with patch('nepse_data_api.security.NepseTokenParser.parse_token_response',
+                       return_value=("fresh", "refresh", [1, 2, 3, 4, 5])):
+                assert Nepse(enable_cache=False).access_token == "fresh"
+
+    def test_async_clients_share_one_prove(self):
+        """Separate AsyncNepse instances authenticating together make one prove call"""
+        async def read():
+            await asyncio.sleep(0.01)  # let the other clients reach the cache check
+            return b'{"prove": 1}'
+        
+        response = MagicMock()
+        response.read = read
+        session = MagicMock()
+        session.get.return_value.__aenter__ = AsyncMock(return_value=response)
+        session.get.return_value.__aexit__ = AsyncMock(return_value=False)
+        
+        async def run():
+            clients = [AsyncNepse(enable_cache=False) for _ in range(3)]
+            with patch.object(AsyncNepse, '_get_session', return_value=session):
+                await asyncio.gather(*(c.authenticate() for c in clients))
+            return clients
+        
+        with patch('nepse_data_api.market._shared_token_cache', {}), \
+             patch('nepse_data_api.security.NepseTokenParser.parse_token_response',
+                   return_value=("access", "refresh", [1, 2, 3, 4, 5])):
+            clients = asyncio.run(run())
+        assert session.get.call_count == 1
+        assert all(c.access_token == "access" for c in clients)
+
+    def test_async_floorsheet_many(self):
+        """Floorsheets for several symbols share one market-status lookup"""
+        status_calls = []
+        
+        async def fake_page(self, params, market_id, headers):
+            return {"content": [params["stockId"]], "totalPages": 1}
+        
+        async def fake_status(self):
+            status_calls.append(1)
+            return {"id": 150}
+        
+        async def run():
+            nepse = AsyncNepse(enable_cache=False)
+            nepse.access_token = "dummy"
+            nepse.salts = [1, 2, 3, 4, 5]
+            nepse.security_id_map = {"NABIL": 131, "NICA": 139}
+            with patch.object(AsyncNepse, '_floorsheet_page', fake_page), \
+                 patch.object(AsyncNepse, 'get_market_status', fake_status):
+                return await nepse.get_floorsheet_many(["nabil", "NICA", "UNKNOWN"])
+        
+        assert asyncio.run(run()) == {"NABIL": [131], "NICA": [139], "UNKNOWN": []}
+        assert len(status_calls) == 1
+
+    @patch('nepse_data_api.market.requests.Session')
+    def test_security_map_persisted(self, mock_session, security_map_dir):
+        """A second client loads today's security map from disk"""
+        mock_session.return_value.get.return_value.status_code = 200
+        mock_session.return_value.get.return_value.content = b'[{"symbol": "NABIL", "id": 131}]'
+        
+        with patch.object(Nepse, 'authenticate'):
+            first = Nepse(enable_cache=False)
+            first.access_token = "dummy"
+            first._ensure_security_ids()
+            assert first.security_id_map == {"NABIL": 131}
+            assert len(list(security_map_dir.glob("security_map.*.json"))) == 1
+            
+            second = Nepse(enable_cache=False)
+            second._ensure_security_ids()
+            assert second.security_id_map == {"NABIL": 131}
+            assert mock_session.return_value.get.call_count == 1
+            
+            # A symbol listed after the file was written triggers one re-fetch
+            mock_session.return_value.get.return_value.content = \
+                b'[{"symbol": "NABIL", "id": 131}, {"symbol": "NICA", "id": 139}]'
+            second._ensure_security_ids("NICA")
+            assert second.security_id_map["NICA"] == 139
+            second._ensure_security_ids("UNKNOWN")
+            assert mock_session.return_value.get.call_count == 2
+
+    def test_async_security_ids_fetched_once(self):
+        """Concurrent tasks share one security-list fetch"""
+        calls = []
+        
+        async def fake_get_json(self, url, conditional=False):
+            calls.append(url)
+            await asyncio.sleep(0.01)
+            return [{"symbol": "NABIL", "id": 131}]
+        
+        async def run():
+            nepse = AsyncNepse(enable_cache=False)
+            with patch.object(AsyncNepse, '_get_json', fake_get_json):
+                await asyncio.gather(*(nepse._ensure_security_ids("NABIL") for _ in range(4)))
+            return nepse.security_id_map
+        
+        assert asyncio.run(run()) == {"NABIL": 131}
+        assert len(calls) == 1
+
+    @patch('nepse_data_api.market.requests.Session')
+    def test_conditional_get_uses_etag(self, mock_session):
+        """A 304 revalidation returns the body kept from the last 200"""
+        first = MagicMock(status_code=200, content=b'{"data": "summary"}',
+                          headers={"ETag": '"v1"'})
+        not_modified = MagicMock(status_code=304, content=b'', headers={})
+        mock_session.return_value.get.side_effect = [first, not_modified]
+        
+        with patch.object(Nepse, 'authenticate'):
+            nepse = Nepse(enable_cache=False)
+            nepse.access_token = "dummy"
+            assert nepse.get_market_summary() == {"data": "summary"}
+            assert nepse.get_market_summary() == {"data": "summary"}
+            
+            headers = mock_session.return_value.get.call_args.kwargs["headers"]
+            assert headers["If-None-Match"] == '"v1"'
+            assert "If-None-Match" not in nepse._get_auth_headers()
+
+    def test_async_session_recreated_for_new_loop(self):
+        """Separate asyncio.run() calls on one instance each get a live session"""
+        nepse = AsyncNepse(enable_cache=False)
+        
+        async def session():
+            return nepse._get_session()
+        
+        first = asyncio.run(session())
+        second = asyncio.run(session())
+        assert second is not first and not second.closed
+        asyncio.run(nepse.close())
@@ -1,4 +1,5 @@
 import pytest
+from nepse_data_api import security
 from nepse_data_api.security import NepseTokenParser
 
 class TestSecurity:
@@ -32,3 +33,12 @@ class TestSecurity:
         except IndexError:
             # Expected if our dummy salts generate indices out of bounds for dummy strings
             pass
+
+    def test_pywasm_fallback_matches(self, monkeypatch):
+        """The pywasm interpreter and the default backend compute the same indices"""
+        salts = (123, 456, 789, 321, 654)
+        expected = NepseTokenParser()._compute_indices(salts)
+        
+        monkeypatch.setattr(security, "wasmtime", None)
+        parser = NepseTokenParser()
+        assert parser._compute_indices(salts) == expected